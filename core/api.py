@@ -1,12 +1,22 @@
+import os
 import time
 import random
 
+from .drawlist import DrawList, execute, optimize, validate
+from .image_cache import ImageCache, blit_sprite
+
 class API:
-    def __init__(self, memory, filesystem, resource_manager, graphics=None):
+    def __init__(self, memory, filesystem, resource_manager, graphics=None, iso_dir=None, image_cache=None):
         self.memory = memory
         self.fs = filesystem
+        if filesystem.memory is None:
+            filesystem.attach_memory(memory)
         self.resource_manager = resource_manager
         self.graphics = graphics
+        self.iso_dir = iso_dir
+        self.images = image_cache if image_cache is not None else ImageCache()
+        self._image_paths = []
+        self._image_handles = {}
 
     # ========== Filesystem ==========
 
@@ -26,6 +36,52 @@ class API:
         self.resource_manager.check_cpu()
         return self.fs.file_exists(path)
 
+    def iterdir(self, path):
+        self.resource_manager.check_cpu()
+        return self.fs.iterdir(path)
+
+    def walk(self, path="/"):
+        """Lazily walk a directory tree, like os.walk()."""
+        self.resource_manager.check_cpu()
+        return self.fs.walk(path)
+
+    def glob(self, pattern):
+        """Lazily yield paths matching pattern; "**" matches any number of path components."""
+        self.resource_manager.check_cpu()
+        return self.fs.glob(pattern)
+
+    def stat(self, path):
+        self.resource_manager.check_cpu()
+        return self.fs.stat(path)
+
+    def du(self, path="/"):
+        """Bytes used by a file or directory tree."""
+        self.resource_manager.check_cpu()
+        return self.fs.du(path)
+
+    # Batch calls: one resource check per batch, each parent directory resolved once.
+
+    def read_many(self, paths):
+        self.resource_manager.check_cpu()
+        return self.fs.read_many(paths)
+
+    def write_many(self, items):
+        self.resource_manager.check_cpu()
+        return self.fs.write_many(items)
+
+    def stat_many(self, paths):
+        self.resource_manager.check_cpu()
+        return self.fs.stat_many(paths)
+
+    def open(self, path, mode="r"):
+        """Open a VM file for streaming reads/writes ("r", "w", "a", "+" and "b" modes).
+
+        Appending through a handle costs only the bytes written, unlike
+        read_file()/write_file(), which copy the whole file.
+        """
+        self.resource_manager.check_cpu()
+        return self.fs.open(path, mode)
+
     # ========== Console I/O ==========
 
     def print(self, *args, **kwargs):
@@ -74,11 +130,117 @@ class API:
             self.graphics.fb.clear((r, g, b))
 
     def draw_rect(self, x, y, w, h, r, g, b):
+        self.fill_rect(x, y, w, h, r, g, b)
+
+    def fill_rect(self, x, y, w, h, r, g, b):
+        self.resource_manager.check_cpu()
+        if self.graphics:
+            self.graphics.fb.fill_rect(x, y, w, h, (r, g, b))
+
+    def draw_hline(self, x, y, length, r, g, b):
+        self.resource_manager.check_cpu()
+        if self.graphics:
+            self.graphics.fb.hline(x, y, length, (r, g, b))
+
+    def draw_vline(self, x, y, length, r, g, b):
+        self.resource_manager.check_cpu()
+        if self.graphics:
+            self.graphics.fb.vline(x, y, length, (r, g, b))
+
+    def blit(self, src_x, src_y, w, h, x, y):
+        """Copy a screen rectangle to another position on the screen."""
+        self.resource_manager.check_cpu()
+        if self.graphics:
+            fb = self.graphics.fb
+            fb.blit(fb, x, y, (src_x, src_y, w, h))
+
+    def scroll(self, dx, dy, x=0, y=0, w=None, h=None, r=0, g=0, b=0):
+        """Shift a screen rectangle (default: whole screen) and fill the uncovered strip."""
+        self.resource_manager.check_cpu()
+        if self.graphics:
+            fb = self.graphics.fb
+            w = fb.width - x if w is None else w
+            h = fb.height - y if h is None else h
+            fb.scroll(dx, dy, (x, y, w, h), (r, g, b))
+
+    def load_image(self, path):
+        """Decode an image from the VM filesystem (or, failing that, the ISO directory).
+
+        Returns a handle for blit_image(); loading the same path again returns
+        the same handle. Decoded pixels live in a bounded cache; an evicted
+        image is transparently reloaded on its next blit.
+        """
+        self.resource_manager.check_cpu()
+        self._sprite(path)
+        handle = self._image_handles.get(path)
+        if handle is None:
+            handle = self._image_handles[path] = len(self._image_paths)
+            self._image_paths.append(path)
+        return handle
+
+    def image_size(self, handle):
+        self.resource_manager.check_cpu()
+        sprite = self._sprite(self._image_paths[handle])
+        return sprite.width, sprite.height
+
+    def blit_image(self, handle, x, y, scale=1, colorkey=None):
         self.resource_manager.check_cpu()
         if self.graphics:
-            for dx in range(w):
-                for dy in range(h):
-                    self.graphics.fb.set_pixel(x + dx, y + dy, (r, g, b))
+            sprite = self._sprite(self._image_paths[handle], scale)
+            blit_sprite(self.graphics.fb, sprite, x, y, colorkey)
+
+    def _sprite(self, path, scale=1):
+        return self.images.get(path, self._read_asset, scale, self._asset_version(path))
+
+    def _in_vm(self, path):
+        # Relative paths only ever name ISO assets.
+        return path.startswith("/") and self.fs.file_exists(path)
+
+    def _iso_path(self, path):
+        if self.iso_dir:
+            root = os.path.realpath(self.iso_dir)
+            host_path = os.path.realpath(os.path.join(root, path.lstrip("/")))
+            if host_path.startswith(root + os.sep) and os.path.isfile(host_path):
+                return host_path
+        return None
+
+    def _asset_version(self, path):
+        """Identify an asset's current contents, so a rewritten image is decoded again."""
+        if self._in_vm(path):
+            return self.fs.digest(path)
+        host_path = self._iso_path(path)
+        if host_path is not None:
+            st = os.stat(host_path)
+            return st.st_mtime_ns, st.st_size
+        return None
+
+    def _read_asset(self, path):
+        if self._in_vm(path):
+            content = self.fs.read_file(path)
+            return content.encode("latin-1") if isinstance(content, str) else bytes(content)
+        host_path = self._iso_path(path)
+        if host_path is not None:
+            with open(host_path, "rb") as f:
+                return f.read()
+        raise FileNotFoundError(f"Image '{path}' not found")
+
+    def draw_list(self):
+        """Return an empty DrawList to record ops for submit()."""
+        return DrawList()
+
+    def submit(self, cmds):
+        """Validate, optimize and run a whole batch of draw ops with one resource check.
+
+        Returns the number of ops actually executed after overdraw merging.
+        """
+        self.resource_manager.check_cpu()
+        ops = validate(cmds)
+        if not self.graphics:
+            return 0
+        fb = self.graphics.fb
+        ops = optimize(ops, fb.width, fb.height)
+        execute(fb, ops)
+        return len(ops)
 
     # Future: mouse, windows, multitasking...
     def get_events(self):
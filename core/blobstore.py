@@ -0,0 +1,91 @@
+"""Process-wide content-addressed store for immutable file contents.
+
+Identical contents written into any FileSystem in the process (or loaded
+from any image) resolve to one Blob, keyed by its SHA-256 digest. Files
+hold a Blob reference until their first in-place write. The store itself
+only keeps weak references, so a Blob's reference count is exactly the
+number of Files (and snapshots of them) still using it; when it drops to
+zero the bytes are freed and the digest leaves the store.
+"""
+import hashlib
+import threading
+import weakref
+
+# Smaller contents are cheaper to copy than to hash and look up.
+BLOB_MIN_SIZE = 64
+
+
+class Blob:
+    """size bytes of buffer starting at offset; buffer is bytes or an mmap and is never written.
+
+    A Blob with digest None has not been hashed and is not in the store.
+    """
+
+    __slots__ = ("digest", "buffer", "offset", "size", "__weakref__")
+
+    def __init__(self, digest, buffer, offset, size):
+        self.digest = digest
+        self.buffer = buffer
+        self.offset = offset
+        self.size = size
+
+    def view(self):
+        return memoryview(self.buffer)[self.offset:self.offset + self.size]
+
+
+def digest_of(data):
+    return hashlib.sha256(data).digest()
+
+
+class BlobStore:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._blobs = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._blobs)
+
+    def get(self, digest):
+        return self._blobs.get(digest)
+
+    def intern(self, data):
+        """Return the Blob for bytes-like data, storing a copy only if the content is new."""
+        digest = digest_of(data)
+        with self._lock:
+            blob = self._blobs.get(digest)
+            if blob is not None:
+                self.hits += 1
+                return blob
+            self.misses += 1
+            blob = self._blobs[digest] = Blob(digest, bytes(data), 0, len(memoryview(data).cast("B")))
+            return blob
+
+    def adopt(self, digest, buffer, offset, size):
+        """Return the Blob for digest, registering buffer[offset:offset + size] without copying if it is new.
+
+        digest must have been computed from those bytes by the caller: the
+        store is shared by every FileSystem in the process, so a wrong one
+        would change other files' contents.
+        """
+        with self._lock:
+            blob = self._blobs.get(digest)
+            if blob is not None:
+                self.hits += 1
+                return blob
+            self.misses += 1
+            blob = self._blobs[digest] = Blob(digest, buffer, offset, size)
+            return blob
+
+    def stats(self):
+        blobs = list(self._blobs.values())
+        return {
+            "blobs": len(blobs),
+            "bytes": sum(blob.size for blob in blobs),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+BLOBS = BlobStore()
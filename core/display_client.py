@@ -0,0 +1,122 @@
+"""Reference viewer for core.display_server.
+
+DisplayClient keeps a local FrameBuffer in sync with the server and sends
+mouse input back. Run ``python -m core.display_client host:port`` for a Tk
+window, or add --headless to just receive frames and print statistics.
+"""
+import argparse
+import json
+import socket
+import struct
+import threading
+import time
+
+from .display_server import EVENT, HELLO, HELLO_MAGIC, MESSAGE, TILE_HEADER, parse_address, recv_exact
+from .graphics import Display, FrameBuffer, screen_scale, tk
+from .tiles import decode_tile, tile_rect, write_tile
+
+
+class DisplayClient:
+    def __init__(self, address):
+        family, sockaddr = parse_address(address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.connect(sockaddr)
+        magic, width, height, self.tile = HELLO.unpack(recv_exact(self.sock, HELLO.size))
+        if magic != HELLO_MAGIC:
+            raise ConnectionError(f"'{address}' is not a PyBox display server")
+        self.fb = FrameBuffer(width, height)
+        self.frames = 0
+        self.bytes_received = 0
+        self._damage = []
+        self._lock = threading.Lock()
+
+    def receive(self):
+        """Read one frame message, apply it to fb and return the updated rectangles."""
+        kind, length = MESSAGE.unpack(recv_exact(self.sock, MESSAGE.size))
+        body = recv_exact(self.sock, length)
+        self.bytes_received += MESSAGE.size + length
+        if kind != b"F":
+            return []
+        rects = []
+        count = struct.unpack_from("<I", body)[0]
+        pos = 4
+        for _ in range(count):
+            tx, ty, size = TILE_HEADER.unpack_from(body, pos)
+            pos += TILE_HEADER.size
+            rect = tile_rect(tx, ty, self.fb.width, self.fb.height, self.tile)
+            write_tile(self.fb.buffer, self.fb.width, rect, decode_tile(body[pos:pos + size]))
+            pos += size
+            rects.append(rect)
+        self.frames += 1
+        with self._lock:
+            self._damage.extend(rects)
+        return rects
+
+    def receive_forever(self):
+        try:
+            while True:
+                self.receive()
+        except (ConnectionError, OSError):
+            pass
+
+    def take_damage(self):
+        """Return and reset the rectangles updated since the last call."""
+        with self._lock:
+            rects, self._damage = self._damage, []
+        return rects
+
+    def click(self, x, y):
+        self.sock.sendall(EVENT.pack(b"C", x, y))
+
+    def move(self, x, y):
+        self.sock.sendall(EVENT.pack(b"M", x, y))
+
+    def release(self):
+        self.sock.sendall(EVENT.pack(b"R", 0, 0))
+
+    def close(self):
+        self.sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PyBox remote display viewer")
+    parser.add_argument("address", nargs="?", default="127.0.0.1:5900", help="host:port or Unix socket path")
+    parser.add_argument("--headless", action="store_true", help="receive frames without Tk")
+    parser.add_argument("--seconds", type=float, default=5.0, help="how long to run in headless mode")
+    parser.add_argument("--scale", type=int, choices=(0, 1, 2, 3, 4), default=0,
+                        help="integer window scale; 0 picks one from the screen DPI")
+    args = parser.parse_args(argv)
+
+    client = DisplayClient(args.address)
+    threading.Thread(target=client.receive_forever, daemon=True).start()
+
+    if args.headless:
+        time.sleep(args.seconds)
+        client.close()
+        print(json.dumps({"frames": client.frames, "bytes": client.bytes_received}))
+        return
+
+    if tk is None:
+        raise RuntimeError("Tk viewer needs tkinter and Pillow's ImageTk; use --headless")
+    root = tk.Tk()
+    root.title(f"PyBox - {args.address}")
+    scale = args.scale or screen_scale(root)
+    canvas = tk.Canvas(root, width=client.fb.width * scale, height=client.fb.height * scale)
+    canvas.pack()
+    display = Display(canvas, client.fb, scale=scale)
+
+    def refresh():
+        display.present(client.take_damage())
+        root.after(15, refresh)
+
+    canvas.bind("<Button-1>", lambda event: client.click(*display.to_fb(event.x, event.y)))
+    canvas.bind("<B1-Motion>", lambda event: client.move(*display.to_fb(event.x, event.y)))
+    canvas.bind("<ButtonRelease-1>", lambda event: client.release())
+
+    refresh()
+    root.mainloop()
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Serve a WindowManager's framebuffer to remote viewers over a local socket.
+
+Meant for headless hosts: the server hooks WindowManager.frame_listeners
+and, for every composited frame, sends only the 16x16 tiles that changed,
+each zlib-compressed. A frame is encoded once and the same bytes are queued
+to every connected viewer. A new viewer (or one that fell too far behind)
+gets a full keyframe first. Viewers send mouse input back, and pump() applies
+it to the WindowManager on the thread that owns it.
+
+Wire format, all little endian:
+    server hello  b"PBDS", width, height, tile
+    server frame  b"F", body length, tile count, then (tx, ty, length, zlib data) per tile
+    client event  kind (b"C" click, b"M" move, b"R" release), x, y
+
+Addresses are "host:port" for TCP or a filesystem path for a Unix socket.
+"""
+import argparse
+import queue
+import socket
+import struct
+import threading
+import time
+
+from .graphics import FrameBuffer, WindowManager, build_demo
+from .tiles import TILE, changed_tiles, encode_tile, read_tile, tile_grid, tile_rect
+
+HELLO = struct.Struct("<4sHHH")
+MESSAGE = struct.Struct("<cI")
+TILE_HEADER = struct.Struct("<HHI")
+EVENT = struct.Struct("<cii")
+HELLO_MAGIC = b"PBDS"
+
+
+def parse_address(address):
+    """Return (family, sockaddr) for "host:port" or a Unix socket path."""
+    if "/" in address or not hasattr(socket, "AF_INET"):
+        return socket.AF_UNIX, address
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def recv_exact(sock, n):
+    data = bytearray()
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        data += chunk
+    return bytes(data)
+
+
+def encode_frame(frame, width, height, tiles, tile=TILE):
+    parts = [struct.pack("<I", len(tiles))]
+    for tx, ty in tiles:
+        data = encode_tile(read_tile(frame, width, tile_rect(tx, ty, width, height, tile)))
+        parts.append(TILE_HEADER.pack(tx, ty, len(data)))
+        parts.append(data)
+    body = b"".join(parts)
+    return MESSAGE.pack(b"F", len(body)) + body
+
+
+class _Viewer:
+    def __init__(self, sock, max_backlog):
+        self.sock = sock
+        self.max_backlog = max_backlog
+        self.queue = queue.Queue()
+        self.alive = True
+        threading.Thread(target=self._send_loop, daemon=True).start()
+
+    def send(self, message, keyframe):
+        """Queue message; a viewer too far behind is resynced with keyframe() instead."""
+        if self.queue.qsize() >= self.max_backlog:
+            try:
+                while True:
+                    self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            message = keyframe()
+        self.queue.put(message)
+
+    def _send_loop(self):
+        while self.alive:
+            message = self.queue.get()
+            if message is None:
+                break
+            try:
+                self.sock.sendall(message)
+            except OSError:
+                break
+        self.alive = False
+        self.sock.close()
+
+    def close(self):
+        self.alive = False
+        self.queue.put(None)
+
+
+class DisplayServer:
+    def __init__(self, wm, address="127.0.0.1:5900", tile=TILE, max_backlog=8):
+        self.wm = wm
+        self.fb = wm.fb
+        self.address = address
+        self.tile = tile
+        self.max_backlog = max_backlog
+        self.events = queue.Queue()
+        self.viewers = []
+        self._prev = self.fb.to_bytes()
+        self._lock = threading.Lock()
+        self._sock = None
+        self._keyframe = None
+        wm.frame_listeners.append(self.publish)
+
+    def start(self):
+        family, sockaddr = parse_address(self.address)
+        self._sock = socket.socket(family, socket.SOCK_STREAM)
+        if family != socket.AF_UNIX:
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(sockaddr)
+        self._sock.listen()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        with self._lock:
+            for viewer in self.viewers:
+                viewer.close()
+            self.viewers = []
+        if self.publish in self.wm.frame_listeners:
+            self.wm.frame_listeners.remove(self.publish)
+
+    def keyframe(self):
+        """Full-frame message for the last published frame, encoded once per frame."""
+        if self._keyframe is None:
+            cols, rows = tile_grid(self.fb.width, self.fb.height, self.tile)
+            tiles = [(tx, ty) for ty in range(rows) for tx in range(cols)]
+            self._keyframe = encode_frame(self._prev, self.fb.width, self.fb.height, tiles, self.tile)
+        return self._keyframe
+
+    def publish(self, rects=None):
+        """Send the tiles changed since the previous frame to every viewer."""
+        frame = self.fb.to_bytes()
+        with self._lock:
+            tiles = list(changed_tiles(self._prev, frame, self.fb.width, self.fb.height, self.tile, rects))
+            if not tiles:
+                return
+            self._prev = frame
+            self._keyframe = None
+            self.viewers = [v for v in self.viewers if v.alive]
+            if not self.viewers:
+                return
+            message = encode_frame(frame, self.fb.width, self.fb.height, tiles, self.tile)
+            for viewer in self.viewers:
+                viewer.send(message, self.keyframe)
+
+    def pump(self):
+        """Apply input received from viewers to the WindowManager; returns the event count."""
+        count = 0
+        while True:
+            try:
+                kind, x, y = self.events.get_nowait()
+            except queue.Empty:
+                return count
+            if kind == b"C":
+                self.wm.handle_click(x, y)
+            elif kind == b"M":
+                self.wm.handle_mouse_move(x, y)
+            elif kind == b"R":
+                self.wm.handle_mouse_release()
+            count += 1
+
+    def serve_forever(self, fps=30):
+        """Run pump() and draw_all() at up to fps frames per second."""
+        frame_time = 1.0 / fps
+        while self._sock is not None:
+            start = time.perf_counter()
+            self.pump()
+            self.wm.draw_all()
+            time.sleep(max(0.0, frame_time - (time.perf_counter() - start)))
+
+    def _accept_loop(self):
+        while self._sock is not None:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            viewer = _Viewer(conn, self.max_backlog)
+            with self._lock:
+                viewer.send(HELLO.pack(HELLO_MAGIC, self.fb.width, self.fb.height, self.tile), self.keyframe)
+                viewer.send(self.keyframe(), self.keyframe)
+                self.viewers.append(viewer)
+            threading.Thread(target=self._read_events, args=(viewer,), daemon=True).start()
+
+    def _read_events(self, viewer):
+        try:
+            while viewer.alive:
+                self.events.put(EVENT.unpack(recv_exact(viewer.sock, EVENT.size)))
+        except (ConnectionError, OSError):
+            viewer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the PyBox demo desktop to remote viewers")
+    parser.add_argument("address", nargs="?", default="127.0.0.1:5900", help="host:port or Unix socket path")
+    parser.add_argument("--fps", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    wm = WindowManager(FrameBuffer(320, 240))
+    build_demo(wm)
+    server = DisplayServer(wm, args.address).start()
+    print(f"Serving display on {args.address}")
+    try:
+        server.serve_forever(args.fps)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Retained draw-command lists for the guest graphics API.
+
+A guest records many draw ops into a DrawList and submits them with one
+api.submit() call. The batch is validated once and cheaply optimized, then
+replayed against the framebuffer's span primitives in one loop:
+
+* everything before the last full-screen clear is dropped,
+* ops that draw nothing (zero or negative sizes, empty text) are dropped,
+* ops completely covered by a later rect fill (with no copy or scroll in
+  between to read the old pixels) are dropped,
+* runs of same-colored adjacent pixels on a row become one hline.
+
+Ops are plain tuples, so a guest may also submit a list it built by hand:
+
+    ("pixel", x, y, color)          ("rect", x, y, w, h, color)
+    ("hline", x, y, length, color)  ("vline", x, y, length, color)
+    ("clear", color)                ("text", x, y, text, color)
+    ("copy", x, y, (sx, sy, w, h))  ("scroll", dx, dy, (x, y, w, h) | None, color | None)
+"""
+from .font import ADVANCE, GLYPH_HEIGHT
+
+INT, COLOR, RECT, TEXT, OPT_RECT, OPT_COLOR = range(6)
+
+SIGNATURES = {
+    "pixel": (INT, INT, COLOR),
+    "rect": (INT, INT, INT, INT, COLOR),
+    "hline": (INT, INT, INT, COLOR),
+    "vline": (INT, INT, INT, COLOR),
+    "clear": (COLOR,),
+    "text": (INT, INT, TEXT, COLOR),
+    "copy": (INT, INT, RECT),
+    "scroll": (INT, INT, OPT_RECT, OPT_COLOR),
+}
+
+# Ops that read pixels already in the framebuffer; overdraw can't be merged across them.
+READS = ("copy", "scroll")
+
+MAX_COVERS = 16
+
+
+class DrawList:
+    """Records draw ops for a single api.submit() call."""
+
+    def __init__(self):
+        self.ops = []
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __iter__(self):
+        return iter(self.ops)
+
+    def pixel(self, x, y, color):
+        self.ops.append(("pixel", x, y, tuple(color)))
+
+    def rect(self, x, y, w, h, color):
+        self.ops.append(("rect", x, y, w, h, tuple(color)))
+
+    def hline(self, x, y, length, color):
+        self.ops.append(("hline", x, y, length, tuple(color)))
+
+    def vline(self, x, y, length, color):
+        self.ops.append(("vline", x, y, length, tuple(color)))
+
+    def clear(self, color=(0, 0, 0)):
+        self.ops.append(("clear", tuple(color)))
+
+    def text(self, x, y, text, color):
+        self.ops.append(("text", x, y, text, tuple(color)))
+
+    def copy(self, src_x, src_y, w, h, x, y):
+        self.ops.append(("copy", x, y, (src_x, src_y, w, h)))
+
+    def scroll(self, dx, dy, rect=None, fill=None):
+        self.ops.append(("scroll", dx, dy, rect and tuple(rect), fill and tuple(fill)))
+
+
+def _check(kind, value):
+    if kind == INT:
+        return isinstance(value, int)
+    if kind == TEXT:
+        return isinstance(value, str)
+    if kind in (OPT_RECT, OPT_COLOR) and value is None:
+        return True
+    if kind == COLOR or kind == OPT_COLOR:
+        return (isinstance(value, tuple) and len(value) == 3
+                and all(isinstance(c, int) and 0 <= c <= 255 for c in value))
+    return isinstance(value, tuple) and len(value) == 4 and all(isinstance(v, int) for v in value)
+
+
+def validate(ops):
+    """Return ops as a list, raising ValueError on the first malformed op."""
+    ops = list(ops)
+    for i, op in enumerate(ops):
+        signature = SIGNATURES.get(op[0]) if isinstance(op, tuple) and op else None
+        if signature is None:
+            raise ValueError(f"draw op {i}: unknown op {op!r}")
+        args = op[1:]
+        if len(args) != len(signature) or not all(_check(k, v) for k, v in zip(signature, args)):
+            raise ValueError(f"draw op {i}: bad arguments for '{op[0]}': {args!r}")
+    return ops
+
+
+def _bounds(op):
+    kind = op[0]
+    if kind == "pixel":
+        return (op[1], op[2], op[1] + 1, op[2] + 1)
+    if kind == "rect":
+        return (op[1], op[2], op[1] + op[3], op[2] + op[4])
+    if kind == "hline":
+        return (op[1], op[2], op[1] + op[3], op[2] + 1)
+    if kind == "vline":
+        return (op[1], op[2], op[1] + 1, op[2] + op[3])
+    if kind == "text":
+        return (op[1], op[2], op[1] + len(op[3]) * ADVANCE, op[2] + GLYPH_HEIGHT)
+    return None
+
+
+def _covered(bounds, covers):
+    x0, y0, x1, y1 = bounds
+    for cx0, cy0, cx1, cy1 in covers:
+        if cx0 <= x0 and cy0 <= y0 and x1 <= cx1 and y1 <= cy1:
+            return True
+    return False
+
+
+def optimize(ops, width, height):
+    """Drop overdrawn ops and merge pixel runs; returns a new op list."""
+    for i in range(len(ops) - 1, -1, -1):
+        op = ops[i]
+        if op[0] == "clear" or (op[0] == "rect" and op[1] <= 0 and op[2] <= 0
+                                and op[1] + op[3] >= width and op[2] + op[4] >= height):
+            ops = ops[i:]
+            break
+
+    kept = []
+    covers = []
+    for op in reversed(ops):
+        if op[0] in READS:
+            covers = []
+            kept.append(op)
+            continue
+        bounds = _bounds(op)
+        if bounds is not None and (bounds[0] >= bounds[2] or bounds[1] >= bounds[3] or _covered(bounds, covers)):
+            continue
+        kept.append(op)
+        if op[0] == "rect" and op[3] > 0 and op[4] > 0 and len(covers) < MAX_COVERS:
+            covers.append(bounds)
+    kept.reverse()
+
+    merged = []
+    for op in kept:
+        if op[0] == "pixel" and merged:
+            last = merged[-1]
+            if last[0] in ("pixel", "hline") and last[2] == op[2] and last[-1] == op[3]:
+                length = 1 if last[0] == "pixel" else last[3]
+                if length >= 1 and last[1] + length == op[1]:
+                    merged[-1] = ("hline", last[1], last[2], length + 1, op[3])
+                    continue
+        merged.append(op)
+    return merged
+
+
+def execute(fb, ops):
+    """Replay already validated ops against a Surface."""
+    handlers = {
+        "pixel": fb.set_pixel,
+        "rect": fb.fill_rect,
+        "hline": fb.hline,
+        "vline": fb.vline,
+        "clear": fb.clear,
+        "text": fb.draw_text,
+        "copy": lambda x, y, src_rect: fb.blit(fb, x, y, src_rect),
+        "scroll": fb.scroll,
+    }
+    for op in ops:
+        handlers[op[0]](*op[1:])
@@ -1,22 +1,573 @@
+import codecs
+import fnmatch
+import io
+import os
+import time
+from collections import OrderedDict
+
+from .blobstore import BLOB_MIN_SIZE, BLOBS, Blob, digest_of
+
+DENTRY_CACHE_SIZE = 1024
+CHUNK_SIZE = 64 * 1024
+# Mounted host metadata is trusted for this long before it is stat()ed again.
+STAT_TTL = 1.0
+# Mounted host files at least this big are read by range on demand instead of whole.
+PREAD_THRESHOLD = 64 * 1024
+
 class File:
-    def __init__(self, name, content=""):
+    """
+    File data kept as a list of bytearray chunks of CHUNK_SIZE bytes (the last
+    one may be shorter), so appends and in-place writes only touch the chunks
+    they cover. Text is stored UTF-8 encoded; ``binary`` records whether the
+    file was last written as bytes or str, which decides what ``content`` returns.
+    ``owner`` is the token of the FileSystem allowed to modify it in place.
+
+    Whole-content writes of BLOB_MIN_SIZE bytes or more are instead backed
+    by a shared, immutable ``blob`` from the process-wide store
+    (core.blobstore), so identical contents across files and FileSystems
+    are held once. Files loaded from an image hold an unhashed blob over
+    the image until digest() verifies it and moves it into the store.
+    Reads slice the blob directly; the data is copied into chunks only on
+    the first in-place write.
+    """
+
+    def __init__(self, name, content="", owner=None):
         self.name = name
+        self.owner = owner
+        self.parent = None
+        self.blob = None
+        self.chunks = []
+        self.size = 0
+        self.binary = False
         self.content = content
 
+    @classmethod
+    def mapped(cls, name, blob, binary=False, owner=None):
+        file = cls(name, owner=owner)
+        file.blob = blob
+        file.size = blob.size
+        file.binary = binary
+        return file
+
+    @property
+    def chunks(self):
+        if self.blob is not None:
+            self._materialize()
+        return self._chunks
+
+    @chunks.setter
+    def chunks(self, value):
+        self._chunks = value
+
+    def _materialize(self):
+        view = self.blob.view()
+        self._chunks = [bytearray(view[i:i + CHUNK_SIZE]) for i in range(0, self.size, CHUNK_SIZE)]
+        self.blob = None
+
+    def digest(self):
+        if self.blob is None:
+            return digest_of(b"".join(self.chunks))
+        blob = self.blob
+        if blob.digest is None:
+            # Private, unhashed data (from an image): hash it once, then share it.
+            blob.digest = digest_of(blob.view())
+            self.blob = BLOBS.adopt(blob.digest, blob.buffer, blob.offset, blob.size)
+        return self.blob.digest
+
+    def copy(self, owner):
+        if self.blob is not None:
+            return File.mapped(self.name, self.blob, self.binary, owner)
+        file = File(self.name, owner=owner)
+        file.chunks = [bytearray(chunk) for chunk in self.chunks]
+        file.size = self.size
+        file.binary = self.binary
+        return file
+
+    @property
+    def content(self):
+        data = bytes(self.blob.view()) if self.blob is not None else b"".join(self.chunks)
+        return data if self.binary else data.decode("utf-8")
+
+    @content.setter
+    def content(self, value):
+        self.set_data(value.encode("utf-8") if isinstance(value, str) else value, not isinstance(value, str))
+
+    def set_data(self, data, binary):
+        """Replace the whole content with bytes-like data; binary decides what ``content`` returns."""
+        self.binary = binary
+        self.truncate(0)
+        if memoryview(data).nbytes >= BLOB_MIN_SIZE:
+            self.blob = BLOBS.intern(data)
+            self.size = self.blob.size
+        else:
+            self.write_at(0, data)
+
+    def read_at(self, offset, n=-1):
+        """
+        Return up to n bytes from offset (all remaining bytes if n < 0) as a memoryview.
+        A read inside one chunk is a zero-copy view of the chunk, so it sees
+        later in-place writes to those bytes; copy it to keep a snapshot.
+        """
+        end = self.size if n < 0 else min(self.size, offset + n)
+        if offset >= end:
+            return memoryview(b"")
+        if self.blob is not None:
+            base = self.blob.offset
+            return memoryview(self.blob.buffer)[base + offset:base + end]
+        first, start = divmod(offset, CHUNK_SIZE)
+        last = (end - 1) // CHUNK_SIZE
+        if first == last:
+            return memoryview(self.chunks[first])[start:start + end - offset]
+        parts = [memoryview(self.chunks[first])[start:]]
+        parts.extend(self.chunks[first + 1:last])
+        parts.append(memoryview(self.chunks[last])[:end - last * CHUNK_SIZE])
+        return memoryview(b"".join(parts))
+
+    def write_at(self, offset, data):
+        """Write bytes-like data at offset, zero-filling any gap past the end."""
+        view = memoryview(data).cast("B")
+        if not view:
+            return 0
+        if offset > self.size:
+            self._append(memoryview(bytes(offset - self.size)))
+        pos = offset
+        while view and pos < self.size:
+            index, start = divmod(pos, CHUNK_SIZE)
+            chunk = self.chunks[index]
+            n = min(len(chunk) - start, len(view))
+            chunk[start:start + n] = view[:n]
+            pos += n
+            view = view[n:]
+        if view:
+            self._append(view)
+        return len(data)
+
+    def _append(self, view):
+        while view:
+            if self.chunks and len(self.chunks[-1]) < CHUNK_SIZE:
+                last = self.chunks[-1]
+                part = view[:CHUNK_SIZE - len(last)]
+                try:
+                    last += part
+                except BufferError:
+                    # A reader still holds a view of this chunk; leave it
+                    # that copy and grow a fresh one.
+                    last = self.chunks[-1] = bytearray(last) + part
+            else:
+                part = view[:CHUNK_SIZE]
+                self.chunks.append(bytearray(part))
+            self.size += len(part)
+            view = view[len(part):]
+
+    def find(self, sub, start=0):
+        """Return the offset of the first sub (a single byte string) at or after start, or -1."""
+        if self.blob is not None:
+            base = self.blob.offset
+            found = self.blob.buffer.find(sub, base + start, base + self.size)
+            return found - base if found >= 0 else -1
+        index, offset = divmod(start, CHUNK_SIZE)
+        while index < len(self.chunks):
+            found = self.chunks[index].find(sub, offset)
+            if found >= 0:
+                return index * CHUNK_SIZE + found
+            index, offset = index + 1, 0
+        return -1
+
+    def truncate(self, size):
+        if size >= self.size:
+            return
+        if size == 0:
+            self.blob = None
+            self.chunks = []
+            self.size = 0
+            return
+        keep = (size + CHUNK_SIZE - 1) // CHUNK_SIZE
+        del self.chunks[keep:]
+        if keep and size % CHUNK_SIZE:
+            self.chunks[-1] = self.chunks[-1][:size % CHUNK_SIZE]
+        self.size = size
+
+class FileHandle:
+    """
+    open()-style handle on a File. Modes are "r", "w", "a", "r+", "w+" and
+    "a+", with "b" for binary. Binary reads return memoryviews (see
+    File.read_at); text reads return str. Positions are byte offsets in
+    both modes, as with tell()/seek() on real text files.
+
+    Given the FileSystem and path it came from, a handle that writes after
+    a snapshot() first asks the FileSystem for its own copy of the file, so
+    the snapshot never sees the write.
+    """
+
+    def __init__(self, file, mode="r", fs=None, path=None):
+        self.file = file
+        self.fs = fs
+        self.path = path
+        self.mode = mode
+        self.binary = "b" in mode
+        self.readable = "r" in mode or "+" in mode
+        self.writable = "w" in mode or "a" in mode or "+" in mode
+        self.append = "a" in mode
+        self.closed = False
+        self.pos = 0
+        if "w" in mode:
+            size = file.size
+            file.truncate(0)
+            file.binary = self.binary
+            if fs is not None:
+                fs._charge(file.parent, -size)
+        elif self.append:
+            self.pos = file.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+    def _check(self, allowed, what):
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+        if not allowed:
+            raise io.UnsupportedOperation(f"File not open for {what}")
+
+    def _own(self):
+        if self.fs is None or self.file.owner is self.fs._owner:
+            return
+        if self._linked():
+            self.file = self.fs._own_file(self.path)
+        else:
+            # Deleted since it was opened: keep writing to a private, unlinked copy.
+            self.file = self.file.copy(self.fs._owner)
+
+    def _linked(self):
+        """True while self.path still names this handle's file."""
+        try:
+            parent, name = self.fs._resolve_path(self.path)
+        except FileNotFoundError:
+            return False
+        return parent.entries.get(name) is self.file
+
+    def _journaled(self):
+        return self.fs is not None and self.fs._journaling(self.path) and self._linked()
+
+    def read(self, n=-1):
+        self._check(self.readable, "reading")
+        if n is None or n < 0:
+            data = self.file.read_at(self.pos)
+            self.pos += len(data)
+            return data if self.binary else str(data, "utf-8")
+        if self.binary:
+            data = self.file.read_at(self.pos, n)
+            self.pos += len(data)
+            return data
+        # n counts characters; a UTF-8 character is at most 4 bytes and an
+        # incremental decoder holds back any partial one at the end.
+        text = codecs.getincrementaldecoder("utf-8")().decode(self.file.read_at(self.pos, n * 4))[:n]
+        self.pos += len(text.encode("utf-8"))
+        return text
+
+    def readline(self):
+        self._check(self.readable, "reading")
+        end = self.file.find(b"\n", self.pos)
+        data = self.file.read_at(self.pos, -1 if end < 0 else end + 1 - self.pos)
+        self.pos += len(data)
+        return data if self.binary else str(data, "utf-8")
+
+    def write(self, data):
+        self._check(self.writable, "writing")
+        if self.binary:
+            if isinstance(data, str):
+                raise TypeError("a bytes-like object is required, not 'str'")
+            raw = data
+        elif isinstance(data, str):
+            raw = data.encode("utf-8")
+        else:
+            raise TypeError(f"write() argument must be str, not {type(data).__name__}")
+        self._own()
+        if self.append:
+            self.pos = self.file.size
+        grow = self.pos + memoryview(raw).nbytes - self.file.size
+        if grow > 0 and self.fs is not None:
+            self.fs._charge(self.file.parent, grow)
+        self.file.write_at(self.pos, raw)
+        if self._journaled():
+            self.fs.journal.write_at(self.path, self.pos, raw)
+        self.pos += memoryview(raw).nbytes
+        return len(data)
+
+    def seek(self, offset, whence=0):
+        self._check(True, "seeking")
+        if whence == 1:
+            offset += self.pos
+        elif whence == 2:
+            offset += self.file.size
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+        self.pos = offset
+        return self.pos
+
+    def tell(self):
+        self._check(True, "telling")
+        return self.pos
+
+    def truncate(self, size=None):
+        self._check(self.writable, "writing")
+        size = self.pos if size is None else size
+        self._own()
+        shrink = self.file.size - size
+        self.file.truncate(size)
+        if shrink > 0 and self.fs is not None:
+            self.fs._charge(self.file.parent, -shrink)
+        if self._journaled():
+            self.fs.journal.truncate(self.path, size)
+        return size
+
+    def close(self):
+        self.closed = True
+
 class Directory:
-    def __init__(self, name):
+    def __init__(self, name, owner=None):
         self.name = name
+        self.owner = owner
+        self.parent = None
+        self.bytes = 0  # total file bytes in this subtree
         self.entries = {}  # name -> File or Directory
 
+    def copy(self, owner):
+        # Shallow: children stay shared until they are written through.
+        directory = Directory(self.name, owner)
+        directory.bytes = self.bytes
+        directory.entries = dict(self.entries)
+        return directory
+
+class HostDirectory(Directory):
+    """
+    A host directory mounted into the VM tree. The listing is read on first
+    access and again only when the directory's mtime changes (checked at
+    most every STAT_TTL seconds). Unchanged children keep their nodes, and
+    so their caches. Nodes have no owner, so a FileSystem never modifies one
+    in place: writes to a writable mount copy it into a plain in-memory
+    Directory (see FileSystem.mount).
+    """
+
+    def __init__(self, name, host_path, readonly=True):
+        self.host_path = host_path
+        self.readonly = readonly
+        self._mtime = None
+        self._checked = None
+        super().__init__(name)
+
+    @property
+    def entries(self):
+        now = time.monotonic()
+        if self._checked is None or now - self._checked >= STAT_TTL:
+            self._checked = now
+            self._revalidate()
+        return self._entries
+
+    @entries.setter
+    def entries(self, value):
+        self._entries = value
+
+    def _revalidate(self):
+        try:
+            mtime = os.stat(self.host_path).st_mtime_ns
+        except OSError:
+            self._mtime = None
+            self._entries = {}
+            return
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        old, entries = self._entries, {}
+        with os.scandir(self.host_path) as scan:
+            for item in scan:
+                node = old.get(item.name)
+                if item.is_dir():
+                    if not isinstance(node, HostDirectory):
+                        node = HostDirectory(item.name, item.path, self.readonly)
+                elif item.is_file():
+                    if not isinstance(node, HostFile):
+                        node = HostFile(item.name, item.path)
+                else:
+                    continue
+                node.parent = self
+                entries[item.name] = node
+        self._entries = entries
+
+class HostFile(File):
+    """
+    A file inside a mounted host directory. Size comes from a cached stat
+    that is refreshed at most every STAT_TTL seconds. Files under
+    PREAD_THRESHOLD bytes are read whole on first access, and a changed
+    mtime or size drops that copy. Bigger files are never held in memory:
+    each read fetches only its own range from the host. If the host
+    truncates the file, reads come back short, and open handles always see
+    the current data.
+    """
+
+    def __init__(self, name, host_path):
+        # Not File.__init__: a host file is never written through this node.
+        self.name = name
+        self.host_path = host_path
+        self.owner = None
+        self.parent = None
+        self.binary = False
+        self._chunks = []
+        self._blob = None
+        self._size = 0
+        self._stamp = None
+        self._checked = None
+        self._digest = None
+
+    def _revalidate(self):
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < STAT_TTL:
+            return
+        self._checked = now
+        try:
+            st = os.stat(self.host_path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = (None, 0)
+        if stamp != self._stamp:
+            self._stamp = stamp
+            self._size = stamp[1]
+            self._blob = None
+
+    @property
+    def size(self):
+        self._revalidate()
+        return self._size
+
+    @size.setter
+    def size(self, value):
+        self._size = value
+
+    @property
+    def blob(self):
+        self._revalidate()
+        if self._size >= PREAD_THRESHOLD:
+            # Whole-content access (copy, content, digest): a fresh read, not kept.
+            data = self._read_range(0, self._size)
+            return Blob(None, data, 0, len(data))
+        if self._blob is None:
+            self._blob = self._load()
+        return self._blob
+
+    @blob.setter
+    def blob(self, value):
+        self._blob = value
+
+    def _load(self):
+        with open(self.host_path, "rb") as f:
+            data = f.read(self._size)
+        return Blob(None, data, 0, len(data))
+
+    def _read_range(self, offset, n):
+        """Up to n bytes from offset, read from the host now; short if the file shrank."""
+        with open(self.host_path, "rb") as f:
+            f.seek(offset)
+            return f.read(n)
+
+    def read_at(self, offset, n=-1):
+        if self.size < PREAD_THRESHOLD:
+            return super().read_at(offset, n)
+        end = self._size if n < 0 else min(self._size, offset + n)
+        if offset >= end:
+            return memoryview(b"")
+        return memoryview(self._read_range(offset, end - offset))
+
+    def find(self, sub, start=0):
+        if self.size < PREAD_THRESHOLD:
+            return super().find(sub, start)
+        pos = start
+        while pos < self._size:
+            block = self._read_range(pos, CHUNK_SIZE)
+            found = block.find(sub)
+            if found >= 0:
+                return pos + found
+            if len(block) < CHUNK_SIZE:
+                break
+            pos += len(block)
+        return -1
+
+    def digest(self):
+        # Host data can change under us, so it never goes into the shared store.
+        self._revalidate()
+        if self._digest is None or self._digest[0] != self._stamp:
+            stamp = self._stamp
+            self._digest = (stamp, digest_of(self.blob.view()))
+        return self._digest[1]
+
+    @property
+    def content(self):
+        # Host files carry no text/binary flag: text if it decodes as UTF-8.
+        data = bytes(self.blob.view())
+        try:
+            return data.decode("utf-8")
+        except UnicodeDecodeError:
+            return data
+
 class FileSystem:
-    def __init__(self):
-        self.root = Directory("/")
+    """
+    In-memory filesystem whose trees can be shared between instances.
+
+    Every node carries the owner token of the FileSystem allowed to modify
+    it in place. snapshot() and clone() hand the current root to a new
+    FileSystem and give this one a fresh token, so both are O(1). After that,
+    a write copies only the directories on the path to the change, plus the
+    file itself (path copying). Layering works the same way: clone many VMs
+    from one base snapshot, and each one holds only the nodes it changed.
+
+    Each Directory keeps the byte total of its subtree, so du() is O(1).
+    Nodes this instance owns point at their owned parent, so a size change
+    walks up once to update the totals. With a Memory attached, the total
+    (rounded up to KB) is charged to it. A write that would exceed the
+    limit raises MemoryError before anything is changed.
+    """
+
+    def __init__(self, dentry_cache_size=DENTRY_CACHE_SIZE, root=None, readonly=False, memory=None):
+        self._owner = object()
+        self.root = root if root is not None else Directory("/", self._owner)
+        self.readonly = readonly
+        self.memory = None
+        self._charged_kb = 0
+        if memory is not None:
+            self.attach_memory(memory)
+        # Optional change log (see core.fsimage.Journal); gets a call per mutation.
+        # Changes under a mount point are not logged: images do not hold mounts.
+        self.journal = None
+        self.mounts = set()
+        # Dentry cache: path -> (generation, parent_dir, final_name), LRU bounded.
+        # Only successful lookups are cached, so creating directories never
+        # makes an entry wrong; removing a directory bumps the generation,
+        # which retires every entry at once.
+        self.dentry_cache_size = dentry_cache_size
+        self.dentry_hits = 0
+        self.dentry_misses = 0
+        self._dentries = OrderedDict()
+        self._generation = 0
 
     def _resolve_path(self, path):
         """
         Resolve path into (parent_dir, final_name).
         Raises FileNotFoundError if intermediate dirs don't exist.
         """
+        cached = self._dentries.get(path)
+        if cached is not None and cached[0] == self._generation:
+            self._dentries.move_to_end(path)
+            self.dentry_hits += 1
+            return cached[1], cached[2]
+        self.dentry_misses += 1
         if not path.startswith("/"):
             raise ValueError("Only absolute paths allowed")
         parts = [p for p in path.strip("/").split("/") if p]
@@ -25,17 +576,255 @@ class FileSystem:
             if part not in current.entries or not isinstance(current.entries[part], Directory):
                 raise FileNotFoundError(f"Directory '{part}' not found in path '{path}'")
             current = current.entries[part]
-        return current, parts[-1] if parts else ""
+        name = parts[-1] if parts else ""
+        self._dentries[path] = (self._generation, current, name)
+        self._dentries.move_to_end(path)
+        if len(self._dentries) > self.dentry_cache_size:
+            self._dentries.popitem(last=False)
+        return current, name
+
+    def _writable_parent(self, path):
+        """
+        Like _resolve_path, but the returned parent may be modified in place:
+        shared directories from the root down to it are copied first.
+        """
+        if self.readonly:
+            raise PermissionError(f"Filesystem is read-only: '{path}'")
+        parent, name = self._resolve_path(path)
+        if parent.owner is self._owner:
+            return parent, name
+        if self.root.owner is not self._owner:
+            self.root = self.root.copy(self._owner)
+        current = self.root
+        for part in [p for p in path.strip("/").split("/") if p][:-1]:
+            child = current.entries[part]
+            if child.owner is not self._owner:
+                if isinstance(child, HostDirectory) and child.readonly:
+                    raise PermissionError(f"'{path}' is on a read-only mount")
+                child = self._link(current, part, child.copy(self._owner))
+            current = child
+        # Cached lookups may still point at the shared originals.
+        self.invalidate_dentries()
+        return current, name
+
+    def _own_file(self, path):
+        """Return the File at path, copied first if it is shared with a snapshot."""
+        parent, name = self._writable_parent(path)
+        entry = parent.entries.get(name)
+        if not isinstance(entry, File):
+            raise FileNotFoundError(f"File '{name}' not found at '{path}'")
+        if entry.owner is not self._owner:
+            entry = self._adopt(parent, name, entry)
+        return entry
+
+    def _adopt(self, parent, name, entry):
+        """Link an owned copy of a shared File into parent, charging any bytes new to this VM."""
+        copy = entry.copy(self._owner)
+        self._charge(parent, copy.size - self._accounted(entry))
+        return self._link(parent, name, copy)
+
+    @staticmethod
+    def _accounted(entry):
+        """Bytes entry counts toward this VM; mounted host data counts only once copied in."""
+        if isinstance(entry, (HostDirectory, HostFile)):
+            return 0
+        return entry.bytes if isinstance(entry, Directory) else entry.size
+
+    @staticmethod
+    def _link(parent, name, node):
+        parent.entries[name] = node
+        node.parent = parent
+        return node
+
+    def attach_memory(self, memory):
+        """Charge this filesystem's bytes, now and as they change, to a Memory budget."""
+        kb = -(-self.root.bytes // 1024)
+        memory.allocate(kb)
+        self.memory = memory
+        self._charged_kb = kb
+
+    def _charge(self, directory, delta):
+        """
+        Add delta bytes to directory and every directory above it. Growth
+        past the Memory limit raises MemoryError before any counter moves.
+        Nothing is counted for a directory that is no longer linked under
+        the root (or None, for a deleted file still open in a handle).
+        """
+        if not delta:
+            return
+        chain = []
+        while directory is not None:
+            chain.append(directory)
+            directory = directory.parent
+        if not chain or chain[-1] is not self.root:
+            return
+        if self.memory is not None:
+            kb = -(-(self.root.bytes + delta) // 1024)
+            if kb > self._charged_kb:
+                self.memory.allocate(kb - self._charged_kb)
+            elif kb < self._charged_kb:
+                self.memory.free(self._charged_kb - kb)
+            self._charged_kb = kb
+        for directory in chain:
+            directory.bytes += delta
+
+    @property
+    def total_bytes(self):
+        return self.root.bytes
+
+    def du(self, path="/"):
+        """Return the bytes used by the file or subtree at path, in O(1)."""
+        if path == "/":
+            return self.root.bytes
+        parent, name = self._resolve_path(path)
+        if name not in parent.entries:
+            raise FileNotFoundError(f"Path '{path}' does not exist")
+        entry = parent.entries[name]
+        return entry.bytes if isinstance(entry, Directory) else entry.size
+
+    def snapshot(self):
+        """Return a read-only FileSystem frozen at the current state, in O(1)."""
+        return self._share(readonly=True)
+
+    def clone(self):
+        """Return an independent writable FileSystem with the current contents, in O(1)."""
+        return self._share(readonly=False)
+
+    def _share(self, readonly):
+        # A fresh token makes every existing node shared for this instance too.
+        self._owner = object()
+        fs = FileSystem(self.dentry_cache_size, root=self.root, readonly=readonly)
+        fs.mounts = set(self.mounts)
+        return fs
+
+    @staticmethod
+    def _normpath(path):
+        return "/" + "/".join(p for p in path.split("/") if p)
+
+    def _journaling(self, path):
+        """True if a change at path goes to the journal (one is attached and path is not on a mount)."""
+        if self.journal is None:
+            return False
+        if self.mounts:
+            path = self._normpath(path)
+            return not any(path == m or path.startswith(m + "/") for m in self.mounts)
+        return True
+
+    def invalidate_dentries(self):
+        """Retire every cached path lookup in O(1); stale entries age out of the LRU."""
+        self._generation += 1
+
+    def dentry_stats(self):
+        return {"hits": self.dentry_hits, "misses": self.dentry_misses, "size": len(self._dentries)}
+
+    def _directory(self, path):
+        if path == "/":
+            return self.root
+        parent, name = self._resolve_path(path)
+        if name not in parent.entries or not isinstance(parent.entries[name], Directory):
+            raise FileNotFoundError(f"Directory '{name}' not found at '{path}'")
+        return parent.entries[name]
+
+    def _grouped(self, paths, resolve):
+        """
+        Yield (path, parent_dir, name) for each path, calling resolve (a
+        _resolve_path-like method) only once per distinct parent path.
+        parent_dir is None when the parent does not exist.
+        """
+        parents = {}
+        for path in paths:
+            prefix, _, name = path.rpartition("/")
+            if name and prefix in parents:
+                yield path, parents[prefix], name
+                continue
+            try:
+                parent, name = resolve(path)
+            except FileNotFoundError:
+                parent = None
+            if name:
+                parents[prefix] = parent
+            yield path, parent, name
 
     def list_dir(self, path):
+        return list(self._directory(path).entries.keys())
+
+    def iterdir(self, path):
+        """Yield the full path of each entry in a directory."""
+        base = path.rstrip("/")
+        # Copy the names only, so the directory may change while we yield.
+        for name in tuple(self._directory(path).entries):
+            yield f"{base}/{name}"
+
+    def walk(self, path="/"):
+        """
+        Like os.walk: lazily yield (dirpath, dirnames, filenames), top-down.
+        Removing names from dirnames in place prunes those subtrees.
+        """
+        stack = [(path.rstrip("/") or "/", self._directory(path))]
+        while stack:
+            dirpath, directory = stack.pop()
+            dirnames, filenames = [], []
+            for name, entry in tuple(directory.entries.items()):
+                (dirnames if isinstance(entry, Directory) else filenames).append(name)
+            yield dirpath, dirnames, filenames
+            base = dirpath.rstrip("/")
+            for name in reversed(dirnames):
+                entry = directory.entries.get(name)
+                if isinstance(entry, Directory):
+                    stack.append((f"{base}/{name}", entry))
+
+    def glob(self, pattern):
+        """
+        Lazily yield paths matching an absolute pattern. Components may use
+        fnmatch wildcards (* ? [..]); a "**" component matches any number
+        of path components. Components without wildcards are looked up directly.
+        """
+        if not pattern.startswith("/"):
+            raise ValueError("Only absolute paths allowed")
+        parts = [p for p in pattern.split("/") if p]
+        stack = [("", self.root, 0)]
+        while stack:
+            path, node, i = stack.pop()
+            if i == len(parts):
+                yield path or "/"
+                continue
+            part = parts[i]
+            if part == "**":
+                stack.append((path, node, i + 1))
+                if isinstance(node, Directory):
+                    for name, entry in reversed(tuple(node.entries.items())):
+                        stack.append((f"{path}/{name}", entry, i))
+            elif not isinstance(node, Directory):
+                continue
+            elif not any(c in part for c in "*?["):
+                entry = node.entries.get(part)
+                if entry is not None:
+                    stack.append((f"{path}/{part}", entry, i + 1))
+            else:
+                for name in reversed(fnmatch.filter(tuple(node.entries), part)):
+                    stack.append((f"{path}/{name}", node.entries[name], i + 1))
+
+    def stat(self, path):
+        """Return {"type": "file", "size", "binary"} or {"type": "dir", "entries", "size"} for path."""
         if path == "/":
-            dir = self.root
-        else:
-            parent, name = self._resolve_path(path)
-            if name not in parent.entries or not isinstance(parent.entries[name], Directory):
-                raise FileNotFoundError(f"Directory '{name}' not found at '{path}'")
-            dir = parent.entries[name]
-        return list(dir.entries.keys())
+            return self._stat_entry(self.root)
+        parent, name = self._resolve_path(path)
+        if name not in parent.entries:
+            raise FileNotFoundError(f"Path '{path}' does not exist")
+        return self._stat_entry(parent.entries[name])
+
+    @staticmethod
+    def _stat_entry(entry):
+        if isinstance(entry, Directory):
+            return {"type": "dir", "entries": len(entry.entries), "size": entry.bytes}
+        return {"type": "file", "size": entry.size, "binary": entry.binary}
+
+    def digest(self, path):
+        """SHA-256 of the file at path; O(1) once known for blob-backed (whole-written or loaded) files."""
+        parent, name = self._resolve_path(path)
+        if name not in parent.entries or not isinstance(parent.entries[name], File):
+            raise FileNotFoundError(f"File '{name}' not found at '{path}'")
+        return parent.entries[name].digest()
 
     def read_file(self, path):
         parent, name = self._resolve_path(path)
@@ -43,25 +832,112 @@ class FileSystem:
             raise FileNotFoundError(f"File '{name}' not found at '{path}'")
         return parent.entries[name].content
 
+    def read_many(self, paths):
+        """read_file() for each path, resolving each distinct parent directory once."""
+        contents = []
+        for path, parent, name in self._grouped(paths, self._resolve_path):
+            entry = parent.entries.get(name) if parent is not None else None
+            if not isinstance(entry, File):
+                raise FileNotFoundError(f"File '{name}' not found at '{path}'")
+            contents.append(entry.content)
+        return contents
+
+    def stat_many(self, paths):
+        """stat() for each path, with None for paths that do not exist."""
+        stats = []
+        for path, parent, name in self._grouped(paths, self._resolve_path):
+            if path == "/":
+                stats.append(self._stat_entry(self.root))
+            elif parent is None or name not in parent.entries:
+                stats.append(None)
+            else:
+                stats.append(self._stat_entry(parent.entries[name]))
+        return stats
+
+    def write_many(self, items):
+        """write_file() for each (path, content) pair or dict item, resolving each parent once."""
+        items = list(items.items() if isinstance(items, dict) else items)
+        resolved = self._grouped([path for path, _ in items], self._writable_parent)
+        for (path, parent, name), (_, content) in zip(resolved, items):
+            if parent is None:
+                raise FileNotFoundError(f"Parent directory of '{path}' not found")
+            self._write_entry(parent, name, path, content)
+        return len(items)
+
     def write_file(self, path, content):
-        parent, name = self._resolve_path(path)
-        if name in parent.entries:
-            if not isinstance(parent.entries[name], File):
-                raise IsADirectoryError(f"Path '{path}' is a directory")
-            parent.entries[name].content = content
-        else:
-            parent.entries[name] = File(name, content)
+        parent, name = self._writable_parent(path)
+        self._write_entry(parent, name, path, content)
+
+    def _write_entry(self, parent, name, path, content):
+        entry = parent.entries.get(name)
+        if entry is not None and not isinstance(entry, File):
+            raise IsADirectoryError(f"Path '{path}' is a directory")
+        binary = not isinstance(content, str)
+        data = content if binary else content.encode("utf-8")
+        self._charge(parent, memoryview(data).nbytes - (self._accounted(entry) if entry is not None else 0))
+        if entry is None or entry.owner is not self._owner:
+            entry = self._link(parent, name, File(name, owner=self._owner))
+        entry.set_data(data, binary)
+        if self._journaling(path):
+            self.journal.write_file(path, content)
+
+    def open(self, path, mode="r"):
+        """Open a file for streaming access; see FileHandle for the modes."""
+        if mode.replace("b", "") not in ("r", "w", "a", "r+", "w+", "a+"):
+            raise ValueError(f"invalid mode: '{mode}'")
+        writing = not mode.startswith("r") or "+" in mode
+        parent, name = self._writable_parent(path) if writing else self._resolve_path(path)
+        entry = parent.entries.get(name)
+        if isinstance(entry, Directory):
+            raise IsADirectoryError(f"Path '{path}' is a directory")
+        created = entry is None
+        if created:
+            if mode.startswith("r"):
+                raise FileNotFoundError(f"File '{name}' not found at '{path}'")
+            entry = self._link(parent, name, File(name, b"" if "b" in mode else "", self._owner))
+        elif writing and entry.owner is not self._owner:
+            if "w" in mode:
+                # Truncating anyway, so skip copying the old data.
+                self._charge(parent, -self._accounted(entry))
+                entry = self._link(parent, name, File(name, owner=self._owner))
+            else:
+                entry = self._adopt(parent, name, entry)
+        if (created or "w" in mode) and self._journaling(path):
+            self.journal.write_file(path, b"" if "b" in mode else "")
+        return FileHandle(entry, mode, self, path)
 
     def make_dir(self, path):
         if path == "/":
             return  # root exists
-        parent, name = self._resolve_path(path)
+        parent, name = self._writable_parent(path)
         if name in parent.entries:
             if not isinstance(parent.entries[name], Directory):
                 raise FileExistsError(f"File exists at '{path}'")
             # Directory already exists - no op
         else:
-            parent.entries[name] = Directory(name)
+            self._link(parent, name, Directory(name, self._owner))
+            if self._journaling(path):
+                self.journal.make_dir(path)
+
+    def mount(self, vm_path, host_dir, readonly=True):
+        """
+        Expose host_dir at vm_path. Directories are listed and files read only
+        when first accessed, and large files are read by range as needed. Host
+        data is not charged to the VM's Memory. With readonly=False the VM
+        may change the mounted tree. Changes are copied into memory
+        (copy-on-write) and never written back to the host. Mounts are not
+        part of a saved image, and changes under one are not journaled.
+        """
+        if not os.path.isdir(host_dir):
+            raise NotADirectoryError(f"Host directory '{host_dir}' not found")
+        parent, name = self._writable_parent(vm_path)
+        if not name:
+            raise ValueError("Cannot mount over the root directory")
+        if name in parent.entries:
+            raise FileExistsError(f"Path '{vm_path}' already exists")
+        node = self._link(parent, name, HostDirectory(name, os.path.realpath(host_dir), readonly))
+        self.mounts.add(self._normpath(vm_path))
+        return node
 
     def file_exists(self, path):
         try:
@@ -71,7 +947,18 @@ class FileSystem:
             return False
 
     def delete(self, path):
-        parent, name = self._resolve_path(path)
+        parent, name = self._writable_parent(path)
         if name not in parent.entries:
             raise FileNotFoundError(f"Path '{path}' does not exist")
-        del parent.entries[name]
+        entry = parent.entries.pop(name)
+        if isinstance(entry, Directory):
+            self.invalidate_dentries()
+        self._charge(parent, -self._accounted(entry))
+        if entry.owner is self._owner:
+            # Open handles may still write to it; unlinked, those writes are not counted.
+            entry.parent = None
+        if self._journaling(path):
+            self.journal.delete(path)
+        if self.mounts and isinstance(entry, Directory):
+            path = self._normpath(path)
+            self.mounts = {m for m in self.mounts if m != path and not m.startswith(path + "/")}
@@ -1,31 +1,108 @@
-# Basic 5x5 pixel font
+from collections import OrderedDict
+
+# Basic 5x5 pixel font, shared by every text renderer in core.
+GLYPH_WIDTH = 5
+GLYPH_HEIGHT = 5
+ADVANCE = 6
+
 PIXEL_FONT = {
-    "A": [
-        "  #  ",
-        " # # ",
-        "#####",
-        "#   #",
-        "#   #"
-    ],
-    "B": [
-        "#### ",
-        "#   #",
-        "#### ",
-        "#   #",
-        "#### "
-    ],
-    # Add more as needed: C-Z, a-z, 0-9, etc.
+    "A": ["  #  "," # # ","#####","#   #","#   #"],
+    "B": ["#### ","#   #","#### ","#   #","#### "],
+    "C": [" ####","#    ","#    ","#    "," ####"],
+    "D": ["#### ","#   #","#   #","#   #","#### "],
+    "E": ["#####","#    ","#### ","#    ","#####"],
+    "F": ["#####","#    ","#### ","#    ","#    "],
+    "G": [" ####","#    ","#  ##","#   #"," ####"],
+    "H": ["#   #","#   #","#####","#   #","#   #"],
+    "I": ["#####","  #  ","  #  ","  #  ","#####"],
+    "J": ["#####","   # ","   # ","#  # "," ##  "],
+    "K": ["#   #","#  # ","###  ","#  # ","#   #"],
+    "L": ["#    ","#    ","#    ","#    ","#####"],
+    "M": ["#   #","## ##","# # #","#   #","#   #"],
+    "N": ["#   #","##  #","# # #","#  ##","#   #"],
+    "O": [" ### ","#   #","#   #","#   #"," ### "],
+    "P": ["#### ","#   #","#### ","#    ","#    "],
+    "Q": [" ### ","#   #","#   #","#  ##"," ####"],
+    "R": ["#### ","#   #","#### ","#  # ","#   #"],
+    "S": [" ####","#    "," ### ","    #","#### "],
+    "T": ["#####","  #  ","  #  ","  #  ","  #  "],
+    "U": ["#   #","#   #","#   #","#   #"," ### "],
+    "V": ["#   #","#   #","#   #"," # # ","  #  "],
+    "W": ["#   #","#   #","# # #","## ##","#   #"],
+    "X": ["#   #"," # # ","  #  "," # # ","#   #"],
+    "Y": ["#   #"," # # ","  #  ","  #  ","  #  "],
+    "Z": ["#####","   # ","  #  "," #   ","#####"],
+    " ": ["     ","     ","     ","     ","     "],
 }
 
+_glyph_spans = {}
+_text_stamps = OrderedDict()
+TEXT_CACHE_SIZE = 256
+
+def glyph_spans(char):
+    """Return the lit pixels of a glyph as (row, col, length) horizontal runs.
+
+    Each glyph is rasterized from PIXEL_FONT once; unknown characters map to
+    an empty run list.
+    """
+    char = char.upper()
+    spans = _glyph_spans.get(char)
+    if spans is None:
+        spans = []
+        for row, line in enumerate(PIXEL_FONT.get(char, ())):
+            col = 0
+            while col < len(line):
+                if line[col] == "#":
+                    end = col
+                    while end < len(line) and line[end] == "#":
+                        end += 1
+                    spans.append((row, col, end - col))
+                    col = end
+                else:
+                    col += 1
+        _glyph_spans[char] = spans
+    return spans
+
+class TextStamp:
+    """A whole string pre-rendered in one color, ready to be stamped onto a surface.
+
+    ``spans`` holds (dy, dx, run) tuples where ``run`` is the packed RGB bytes
+    for that horizontal run.
+    """
+
+    def __init__(self, text, color):
+        self.text = text
+        self.color = color
+        self.width = max(0, len(text) * ADVANCE - 1)
+        self.height = GLYPH_HEIGHT
+        pixel = bytes(color)
+        self.spans = [
+            (row, i * ADVANCE + col, pixel * length)
+            for i, char in enumerate(text)
+            for row, col, length in glyph_spans(char)
+        ]
+
+def text_stamp(text, color):
+    """Return the cached TextStamp for (text, color), building it on first use."""
+    key = (text, tuple(color))
+    stamp = _text_stamps.get(key)
+    if stamp is None:
+        stamp = TextStamp(text, key[1])
+        _text_stamps[key] = stamp
+        if len(_text_stamps) > TEXT_CACHE_SIZE:
+            _text_stamps.popitem(last=False)
+    else:
+        _text_stamps.move_to_end(key)
+    return stamp
+
 def draw_char(buffer, x, y, char, color):
-    glyph = PIXEL_FONT.get(char.upper())
-    if not glyph:
-        return
-    for row, line in enumerate(glyph):
-        for col, pixel in enumerate(line):
-            if pixel == "#":
-                buffer.set_pixel(x + col, y + row, color)
+    draw_text(buffer, x, y, char, color)
 
 def draw_text(buffer, x, y, text, color):
-    for i, char in enumerate(text):
-        draw_char(buffer, x + i * 6, y, char, color)
+    stamp = text_stamp(text, color)
+    if hasattr(buffer, "draw_stamp"):
+        buffer.draw_stamp(x, y, stamp)
+        return
+    for dy, dx, run in stamp.spans:
+        for i in range(len(run) // 3):
+            buffer.set_pixel(x + dx + i, y + dy, stamp.color)
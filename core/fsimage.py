@@ -0,0 +1,219 @@
+"""Binary on-disk images of a FileSystem, plus an append-only journal.
+
+save() writes the whole tree; load() maps the image and builds only the
+directory nodes. File data stays in the mapping until a file is first
+written (see File.mapped), so opening a large image costs time and memory
+in proportion to the number of nodes, not the number of bytes. Every file
+is stored with its SHA-256 digest, so identical contents are written once
+per image. The digests are not trusted on load: files keep private views
+of their own mapping until File.digest() has hashed the bytes, and only
+then join the process's blob store. Changes made after load() are appended to "<image>.journal" and replayed on the next
+load, until the next save() folds them into a fresh image.
+
+Image layout (little endian):
+    header   MAGIC, version, node count, string table offset, index offset
+    payloads raw file bytes, each distinct content stored once
+    strings  UTF-8 names, each distinct name stored once
+    index    one NODE per node in preorder: kind, name length, name offset,
+             parent index, payload offset, payload size, digest (node 0 is
+             the root)
+
+Journal records are RECORD (op, flags, path length, argument, data length)
+followed by the path and the data. A torn record at the end is ignored, and
+so is a record whose target no longer fits the tree (a write to a missing
+file, say), so one bad record never makes the image unloadable.
+"""
+import mmap
+import os
+import struct
+
+from .blobstore import Blob
+from .filesystem import Directory, File, FileSystem, HostDirectory, HostFile
+
+MAGIC = b"PBFS1\0\0\0"
+VERSION = 2
+HEADER = struct.Struct("<8sIIQQ")
+NODE = struct.Struct("<BxHIIQQ32s")
+DIR, TEXT, BINARY = 0, 1, 2
+
+RECORD = struct.Struct("<BBHQQ")
+WRITE, MKDIR, DELETE, WRITE_AT, TRUNCATE = range(5)
+
+
+def journal_path(path):
+    return path + ".journal"
+
+
+def save(fs, path):
+    """Write fs to path as a full image and start its journal afresh.
+
+    Mount points and everything under them are left out, as they are from
+    the journal: mounted host data stays on the host.
+    """
+    tmp = path + ".tmp"
+    nodes = []
+    names = {}
+    payloads = {}
+    strings = bytearray()
+    with open(tmp, "wb") as f:
+        f.write(bytes(HEADER.size))
+        stack = [("", "", fs.root, 0)]
+        while stack:
+            node_path, name, node, parent = stack.pop()
+            encoded = name.encode("utf-8")
+            if encoded not in names:
+                names[encoded] = len(strings)
+                strings += encoded
+            index = len(nodes)
+            if isinstance(node, Directory):
+                nodes.append((DIR, len(encoded), names[encoded], parent, 0, 0, bytes(32)))
+                for child, entry in reversed(node.entries.items()):
+                    child_path = f"{node_path}/{child}"
+                    if not isinstance(entry, (HostDirectory, HostFile)) and child_path not in fs.mounts:
+                        stack.append((child_path, child, entry, index))
+            else:
+                digest = node.digest()
+                if digest not in payloads:
+                    payloads[digest] = f.tell()
+                    if node.blob is not None:
+                        f.write(node.blob.view())
+                    else:
+                        f.writelines(node.chunks)
+                kind = BINARY if node.binary else TEXT
+                nodes.append((kind, len(encoded), names[encoded], parent, payloads[digest], node.size, digest))
+        strings_offset = f.tell()
+        f.write(strings)
+        index_offset = f.tell()
+        f.write(b"".join(NODE.pack(*node) for node in nodes))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, len(nodes), strings_offset, index_offset))
+    os.replace(tmp, path)
+
+    jpath = journal_path(path)
+    if fs.journal is not None and fs.journal.path == jpath:
+        fs.journal.reset()
+    elif os.path.exists(jpath):
+        os.remove(jpath)
+
+
+def load(path, journal=True):
+    """Map the image at path and return its FileSystem, with the journal replayed.
+
+    With journal=True the returned FileSystem keeps logging its changes to
+    the image's journal.
+    """
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, count, strings_offset, index_offset = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"'{path}' is not a PyBox filesystem image")
+    if version != VERSION:
+        raise ValueError(f"Unsupported filesystem image version {version}")
+
+    fs = FileSystem()
+    owner = fs._owner
+    strings = data[strings_offset:index_offset]
+    nodes = [fs.root]
+    parents = [None]
+    blobs = {}
+    index = data[index_offset + NODE.size:index_offset + count * NODE.size]
+    for kind, name_len, name_off, parent, offset, size, _ in NODE.iter_unpack(index):
+        name = strings[name_off:name_off + name_len].decode("utf-8")
+        if kind == DIR:
+            node = Directory(name, owner)
+        else:
+            # Unhashed, so not shared outside this FileSystem; equal payloads share one Blob.
+            blob = blobs.get((offset, size))
+            if blob is None:
+                blob = blobs[offset, size] = Blob(None, data, offset, size)
+            node = File.mapped(name, blob, kind == BINARY, owner)
+        fs._link(nodes[parent], name, node)
+        nodes.append(node)
+        parents.append(parent)
+    # Preorder puts children after their parents, so one reverse pass sums subtree sizes.
+    for i in range(len(nodes) - 1, 0, -1):
+        node = nodes[i]
+        nodes[parents[i]].bytes += node.bytes if isinstance(node, Directory) else node.size
+
+    jpath = journal_path(path)
+    if os.path.exists(jpath):
+        Journal.replay(jpath, fs)
+    if journal:
+        fs.journal = Journal(jpath)
+    return fs
+
+
+class Journal:
+    """Append-only log of FileSystem changes; FileSystem calls one method per mutation."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "ab")
+
+    def _record(self, op, path, arg=0, data=b"", flags=0):
+        name = path.encode("utf-8")
+        self._file.write(RECORD.pack(op, flags, len(name), arg, len(data)))
+        self._file.write(name)
+        self._file.write(data)
+        self._file.flush()
+
+    def write_file(self, path, content):
+        binary = not isinstance(content, str)
+        self._record(WRITE, path, data=content if binary else content.encode("utf-8"), flags=binary)
+
+    def make_dir(self, path):
+        self._record(MKDIR, path)
+
+    def delete(self, path):
+        self._record(DELETE, path)
+
+    def write_at(self, path, offset, data):
+        self._record(WRITE_AT, path, offset, memoryview(data).cast("B"))
+
+    def truncate(self, path, size):
+        self._record(TRUNCATE, path, size)
+
+    def reset(self):
+        self._file.seek(0)
+        self._file.truncate()
+
+    def close(self):
+        self._file.close()
+
+    @staticmethod
+    def replay(path, fs):
+        """Apply the records in the journal at path to fs; returns how many were applied.
+
+        Records that fail against the tree (missing target, wrong node type)
+        are skipped.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        pos = count = 0
+        while pos + RECORD.size <= len(data):
+            op, flags, path_len, arg, data_len = RECORD.unpack_from(data, pos)
+            start = pos + RECORD.size
+            end = start + path_len + data_len
+            if end > len(data):
+                break
+            target = data[start:start + path_len].decode("utf-8")
+            payload = data[start + path_len:end]
+            pos = end
+            try:
+                if op == WRITE:
+                    fs.write_file(target, payload if flags else payload.decode("utf-8"))
+                elif op == MKDIR:
+                    fs.make_dir(target)
+                elif op == DELETE:
+                    fs.delete(target)
+                elif op == WRITE_AT:
+                    with fs.open(target, "r+b") as handle:
+                        handle.seek(arg)
+                        handle.write(payload)
+                elif op == TRUNCATE:
+                    with fs.open(target, "r+b") as handle:
+                        handle.truncate(arg)
+            except (FileNotFoundError, FileExistsError, IsADirectoryError, NotADirectoryError, PermissionError):
+                continue
+            count += 1
+        return count
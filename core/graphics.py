@@ -1,102 +1,377 @@
-import tkinter as tk
-from PIL import Image, ImageTk
-from tkinter import filedialog
-
-
-root = tk.Tk()
-fb = FrameBuffer(320, 240)
-wm = WindowManager(fb)
-
-# Create a window or two here, maybe add buttons...
-
-canvas = tk.Canvas(root, width=fb.width, height=fb.height)
-canvas.pack()
-# Basic 5x5 pixel font for letters used in buttons
-PIXEL_FONT = {
-    "A": ["  #  "," # # ","#####","#   #","#   #"],
-    "B": ["#### ","#   #","#### ","#   #","#### "],
-    "C": [" ####","#    ","#    ","#    "," ####"],
-    "D": ["#### ","#   #","#   #","#   #","#### "],
-    "E": ["#####","#    ","#### ","#    ","#####"],
-    "F": ["#####","#    ","#### ","#    ","#    "],
-    "G": [" ####","#    ","#  ##","#   #"," ####"],
-    "H": ["#   #","#   #","#####","#   #","#   #"],
-    "I": ["#####","  #  ","  #  ","  #  ","#####"],
-    "J": ["#####","   # ","   # ","#  # "," ##  "],
-    "K": ["#   #","#  # ","###  ","#  # ","#   #"],
-    "L": ["#    ","#    ","#    ","#    ","#####"],
-    "M": ["#   #","## ##","# # #","#   #","#   #"],
-    "N": ["#   #","##  #","# # #","#  ##","#   #"],
-    "O": [" ### ","#   #","#   #","#   #"," ### "],
-    "P": ["#### ","#   #","#### ","#    ","#    "],
-    "Q": [" ### ","#   #","#   #","#  ##"," ####"],
-    "R": ["#### ","#   #","#### ","#  # ","#   #"],
-    "S": [" ####","#    "," ### ","    #","#### "],
-    "T": ["#####","  #  ","  #  ","  #  ","  #  "],
-    "U": ["#   #","#   #","#   #","#   #"," ### "],
-    "V": ["#   #","#   #","#   #"," # # ","  #  "],
-    "W": ["#   #","#   #","# # #","## ##","#   #"],
-    "X": ["#   #"," # # ","  #  "," # # ","#   #"],
-    "Y": ["#   #"," # # ","  #  ","  #  ","  #  "],
-    "Z": ["#####","   # ","  #  "," #   ","#####"],
-    " ": ["     ","     ","     ","     ","     "],
-}
-
-def draw_char(buffer, x, y, char, color):
-    glyph = PIXEL_FONT.get(char.upper())
-    if not glyph:
-        return
-    for row, line in enumerate(glyph):
-        for col, pixel in enumerate(line):
-            if pixel == "#":
-                buffer.set_pixel(x + col, y + row, color)
+import argparse
+import json
+import os
+import time
+
+from .font import GLYPH_HEIGHT, draw_text
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import tkinter as tk
+    from PIL import ImageTk
+except ImportError:
+    tk = ImageTk = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def rect_intersect(a, b):
+    """Intersect two (x0, y0, x1, y1) rectangles; returns None when they don't overlap."""
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[2], b[2]), min(a[3], b[3])
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return (x0, y0, x1, y1)
+
+def rect_subtract(a, b):
+    """Return rectangle a minus rectangle b as up to four disjoint rectangles."""
+    if rect_intersect(a, b) is None:
+        return [a]
+    ax0, ay0, ax1, ay1 = a
+    bx0, by0, bx1, by1 = b
+    pieces = []
+    if ay0 < by0:
+        pieces.append((ax0, ay0, ax1, by0))
+    if by1 < ay1:
+        pieces.append((ax0, by1, ax1, ay1))
+    my0, my1 = max(ay0, by0), min(ay1, by1)
+    if ax0 < bx0:
+        pieces.append((ax0, my0, bx0, my1))
+    if bx1 < ax1:
+        pieces.append((bx1, my0, ax1, my1))
+    return pieces
+
+class Damage:
+    """Accumulates dirty (x0, y0, x1, y1) rectangles, merging any that touch."""
+
+    def __init__(self, max_rects=8):
+        self.rects = []
+        self.max_rects = max_rects
+
+    def add(self, rect):
+        if rect is None or rect[0] >= rect[2] or rect[1] >= rect[3]:
+            return
+        x0, y0, x1, y1 = rect
+        merged = True
+        while merged:
+            merged = False
+            for i, (rx0, ry0, rx1, ry1) in enumerate(self.rects):
+                if rx0 <= x1 and x0 <= rx1 and ry0 <= y1 and y0 <= ry1:
+                    x0, y0, x1, y1 = min(x0, rx0), min(y0, ry0), max(x1, rx1), max(y1, ry1)
+                    del self.rects[i]
+                    merged = True
+                    break
+        self.rects.append((x0, y0, x1, y1))
+        if len(self.rects) > self.max_rects:
+            self.rects = [(
+                min(r[0] for r in self.rects), min(r[1] for r in self.rects),
+                max(r[2] for r in self.rects), max(r[3] for r in self.rects),
+            )]
+
+    def take(self):
+        rects = self.rects
+        self.rects = []
+        return rects
+
+class SpatialGrid:
+    """Uniform grid index from screen tiles to the keys whose rectangles overlap them.
+
+    Each key is stored in every ``cell`` x ``cell`` tile its rectangle touches,
+    so a point lookup only examines the keys registered in one tile.
+    """
+
+    def __init__(self, cell=32):
+        self.cell = cell
+        self.cells = {}
+        self.rects = {}
+
+    def _tiles(self, rect):
+        x0, y0, x1, y1 = rect
+        c = self.cell
+        for ty in range(y0 // c, (y1 - 1) // c + 1):
+            for tx in range(x0 // c, (x1 - 1) // c + 1):
+                yield (tx, ty)
+
+    def insert(self, key, rect):
+        old = self.rects.get(key)
+        if old == rect:
+            return
+        if old is not None:
+            self.remove(key)
+        if rect[0] >= rect[2] or rect[1] >= rect[3]:
+            return
+        self.rects[key] = rect
+        for tile in self._tiles(rect):
+            self.cells.setdefault(tile, set()).add(key)
+
+    def remove(self, key):
+        rect = self.rects.pop(key, None)
+        if rect is None:
+            return
+        for tile in self._tiles(rect):
+            bucket = self.cells[tile]
+            bucket.discard(key)
+            if not bucket:
+                del self.cells[tile]
+
+    def clear(self):
+        self.cells.clear()
+        self.rects.clear()
 
-def draw_text(buffer, x, y, text, color):
-    for i, char in enumerate(text):
-        draw_char(buffer, x + i * 6, y, char, color)
+    def query_point(self, x, y):
+        """Return the keys whose rectangle contains (x, y)."""
+        bucket = self.cells.get((x // self.cell, y // self.cell), ())
+        hits = []
+        for key in bucket:
+            x0, y0, x1, y1 = self.rects[key]
+            if x0 <= x < x1 and y0 <= y < y1:
+                hits.append(key)
+        return hits
+
+class Surface:
+    """Row-major RGB pixel store: 3 bytes per pixel in one contiguous bytearray.
+
+    Writes grow ``dirty``, the bounding box of pixels changed since the last
+    ``take_dirty()``.
+    """
 
-class FrameBuffer:
     def __init__(self, width, height):
         self.width = width
         self.height = height
-        self.buffer = [[(0, 0, 0) for _ in range(height)] for _ in range(width)]
+        self.buffer = bytearray(width * height * 3)
+        self.dirty = None
 
     def set_pixel(self, x, y, color):
         if 0 <= x < self.width and 0 <= y < self.height:
-            self.buffer[x][y] = color
+            i = (y * self.width + x) * 3
+            self.buffer[i], self.buffer[i + 1], self.buffer[i + 2] = color
+            d = self.dirty
+            if d is None:
+                self.dirty = [x, y, x + 1, y + 1]
+            else:
+                if x < d[0]:
+                    d[0] = x
+                elif x >= d[2]:
+                    d[2] = x + 1
+                if y < d[1]:
+                    d[1] = y
+                elif y >= d[3]:
+                    d[3] = y + 1
+
+    def get_pixel(self, x, y):
+        i = (y * self.width + x) * 3
+        return tuple(self.buffer[i:i + 3])
 
     def clear(self, color=(0, 0, 0)):
-        for x in range(self.width):
-            for y in range(self.height):
-                self.buffer[x][y] = color
-
-    def to_image(self):
-        img = Image.new("RGB", (self.width, self.height))
-        pixels = img.load()
-        for x in range(self.width):
-            for y in range(self.height):
-                pixels[x, y] = self.buffer[x][y]
+        self.buffer[:] = bytes(color) * (self.width * self.height)
+        self.mark_dirty(0, 0, self.width, self.height)
+
+    def fill_rect(self, x, y, w, h, color):
+        area = rect_intersect((x, y, x + w, y + h), (0, 0, self.width, self.height))
+        if area is None:
+            return
+        self._fill(area, color)
+        self.mark_dirty(*area)
+
+    def hline(self, x, y, length, color):
+        self.fill_rect(x, y, length, 1, color)
+
+    def vline(self, x, y, length, color):
+        self.fill_rect(x, y, 1, length, color)
+
+    def blit(self, src, x, y, src_rect=None):
+        """Copy src_rect=(sx, sy, w, h) of surface src (default: all of it) to (x, y)."""
+        sx, sy, w, h = src_rect if src_rect else (0, 0, src.width, src.height)
+        if sx < 0:
+            x, w, sx = x - sx, w + sx, 0
+        if sy < 0:
+            y, h, sy = y - sy, h + sy, 0
+        if x < 0:
+            sx, w, x = sx - x, w + x, 0
+        if y < 0:
+            sy, h, y = sy - y, h + y, 0
+        w = min(w, src.width - sx, self.width - x)
+        h = min(h, src.height - sy, self.height - y)
+        if w <= 0 or h <= 0:
+            return
+        self._copy(src, sx, sy, w, h, x, y)
+        self.mark_dirty(x, y, x + w, y + h)
+
+    def scroll(self, dx, dy, rect=None, fill=None):
+        """Shift the pixels inside rect=(x, y, w, h) by (dx, dy) in place.
+
+        Pixels moved outside the rectangle are dropped; the strip uncovered on
+        the opposite side is painted with ``fill`` (left untouched if None).
+        """
+        x, y, w, h = rect if rect else (0, 0, self.width, self.height)
+        area = rect_intersect((x, y, x + w, y + h), (0, 0, self.width, self.height))
+        if area is None:
+            return
+        x0, y0, x1, y1 = area
+        w, h = x1 - x0, y1 - y0
+        if abs(dx) < w and abs(dy) < h:
+            sx, sy = x0 - min(dx, 0), y0 - min(dy, 0)
+            self._copy(self, sx, sy, w - abs(dx), h - abs(dy), sx + dx, sy + dy)
+            if fill is not None:
+                if dy > 0:
+                    self._fill((x0, y0, x1, y0 + dy), fill)
+                elif dy < 0:
+                    self._fill((x0, y1 + dy, x1, y1), fill)
+                if dx > 0:
+                    self._fill((x0, y0, x0 + dx, y1), fill)
+                elif dx < 0:
+                    self._fill((x1 + dx, y0, x1, y1), fill)
+        elif fill is not None:
+            self._fill(area, fill)
+        self.mark_dirty(*area)
+
+    def draw_text(self, x, y, text, color):
+        draw_text(self, x, y, text, color)
+
+    def draw_stamp(self, x, y, stamp):
+        """Stamp a pre-rendered font.TextStamp at (x, y), clipped to the surface."""
+        area = rect_intersect((x, y, x + stamp.width, y + stamp.height), (0, 0, self.width, self.height))
+        if area is None:
+            return
+        stride = self.width * 3
+        inside = area == (x, y, x + stamp.width, y + stamp.height)
+        for dy, dx, run in stamp.spans:
+            px, py = x + dx, y + dy
+            if not inside:
+                if not 0 <= py < self.height:
+                    continue
+                lo, hi = max(px, 0), min(px + len(run) // 3, self.width)
+                if lo >= hi:
+                    continue
+                run = run[(lo - px) * 3:(hi - px) * 3]
+                px = lo
+            i = py * stride + px * 3
+            self.buffer[i:i + len(run)] = run
+        self.mark_dirty(*area)
+
+    def _fill(self, area, color):
+        x0, y0, x1, y1 = area
+        stride = self.width * 3
+        if x0 == 0 and x1 == self.width:
+            self.buffer[y0 * stride:y1 * stride] = bytes(color) * (self.width * (y1 - y0))
+            return
+        row = bytes(color) * (x1 - x0)
+        for i in range(y0 * stride + x0 * 3, y1 * stride, stride):
+            self.buffer[i:i + len(row)] = row
+
+    def _copy(self, src, sx, sy, w, h, x, y):
+        # Unclipped row copy; walks bottom-up when copying downwards within one buffer.
+        n = w * 3
+        src_stride, dst_stride = src.width * 3, self.width * 3
+        if w == src.width == self.width:
+            self.buffer[y * dst_stride:(y + h) * dst_stride] = src.buffer[sy * src_stride:(sy + h) * src_stride]
+            return
+        rows = range(h - 1, -1, -1) if src is self and y > sy else range(h)
+        for r in rows:
+            si = (sy + r) * src_stride + sx * 3
+            di = (y + r) * dst_stride + x * 3
+            self.buffer[di:di + n] = src.buffer[si:si + n]
+
+    def mark_dirty(self, x0, y0, x1, y1):
+        d = self.dirty
+        if d is None:
+            self.dirty = [x0, y0, x1, y1]
+        else:
+            d[0], d[1] = min(d[0], x0), min(d[1], y0)
+            d[2], d[3] = max(d[2], x1), max(d[3], y1)
+
+    def take_dirty(self):
+        d = self.dirty
+        self.dirty = None
+        return tuple(d) if d else None
+
+    def as_array(self):
+        """Return a (height, width, 3) uint8 NumPy view sharing this buffer."""
+        if np is None:
+            raise RuntimeError("NumPy is not installed")
+        return np.frombuffer(self.buffer, dtype=np.uint8).reshape(self.height, self.width, 3)
+
+class FrameBuffer(Surface):
+    def to_bytes(self, rect=None):
+        """Return packed RGB bytes for the framebuffer or rect=(x0, y0, x1, y1) of it."""
+        if rect is None:
+            return bytes(self.buffer)
+        x0, y0, x1, y1 = rect
+        stride = self.width * 3
+        return b"".join(
+            self.buffer[i:i + (x1 - x0) * 3]
+            for i in range(y0 * stride + x0 * 3, y1 * stride, stride)
+        )
+
+    def save(self, path):
+        """Write the framebuffer to path: binary PPM for .ppm, otherwise via PIL."""
+        if path.lower().endswith(".ppm"):
+            with open(path, "wb") as f:
+                f.write(b"P6 %d %d 255\n" % (self.width, self.height))
+                f.write(self.buffer)
+        else:
+            self.to_image().save(path)
+
+    def to_image(self, rect=None, scale=1):
+        """Return the framebuffer, or just rect=(x0, y0, x1, y1) of it, as a PIL image.
+
+        An integer scale > 1 enlarges the image with nearest-neighbour sampling.
+        """
+        if Image is None:
+            raise RuntimeError("Pillow is not installed")
+        if rect is None:
+            img = Image.frombuffer("RGB", (self.width, self.height), self.buffer, "raw", "RGB", 0, 1)
+        else:
+            x0, y0, x1, y1 = rect
+            stride = self.width * 3
+            view = memoryview(self.buffer)[y0 * stride + x0 * 3:]
+            img = Image.frombuffer("RGB", (x1 - x0, y1 - y0), view, "raw", "RGB", stride, 1)
+        if scale != 1:
+            img = img.resize((img.width * scale, img.height * scale), resample=Image.NEAREST)
         return img
 
+    def clear_rect(self, rect, color=(0, 0, 0)):
+        """Fill a screen rectangle without recording damage (compositor use)."""
+        self._fill(rect, color)
+
 class Button:
     def __init__(self, x, y, w, h, text, callback=None):
         self.x = x
         self.y = y
         self.w = w
         self.h = h
+        self.window = None
         self.text = text
         self.callback = callback
         self.hover = False
 
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, text):
+        self._text = text
+        if self.window is not None:
+            self.window.redraw_widget(self)
+
     def draw(self, win):
+        self.window = win
         border = (100, 100, 100)
         bg = (80, 80, 180) if self.hover else (50, 50, 100)
         text_color = (255, 255, 255)
 
-        for i in range(self.w):
-            for j in range(self.h):
-                color = border if i == 0 or i == self.w - 1 or j == 0 or j == self.h - 1 else bg
-                win.set_pixel(self.x + i, self.y + j, color)
+        win.fill_rect(self.x, self.y, self.w, self.h, bg)
+        win.hline(self.x, self.y, self.w, border)
+        win.hline(self.x, self.y + self.h - 1, self.w, border)
+        win.vline(self.x, self.y, self.h, border)
+        win.vline(self.x + self.w - 1, self.y, self.h, border)
 
         text_x = self.x + 3
         text_y = self.y + (self.h // 2) - 3
@@ -112,32 +387,135 @@ class Button:
     def handle_hover(self, x, y):
         self.hover = self.x <= x < self.x + self.w and self.y <= y < self.y + self.h
 
-class VirtualWindow:
+class VirtualWindow(Surface):
     CLOSE_BTN_POS = (-8, 3)
     CLOSE_BTN_SIZE = (6, 6)
+    TITLE_HEIGHT = 12
+    BORDER_COLOR = (200, 200, 200)
+    CLOSE_BTN_COLOR = (200, 60, 60)
 
     def __init__(self, id, x, y, width, height, title="Window", visible=True):
+        super().__init__(width, height)
         self.id = id
-        self.x = x
-        self.y = y
-        self.w = width
-        self.h = height
+        self.manager = None
+        self._x = x
+        self._y = y
+        self._visible = visible
         self.title = title
-        self.visible = visible
-        self.buffer = [[(0, 0, 0) for _ in range(height)] for _ in range(width)]
         self.dragging = False
         self.drag_offset = (0, 0)
         self.widgets = []
+        self.widgets_dirty = True
+        self.hovered = None
         self.should_close = False
+        self._widget_grid = SpatialGrid(cell=16)
+        self._indexed_widgets = 0
+        self._drawn_widgets = 0
+        self._stale_widgets = []
+        self._chrome = None
+        self._chrome_key = None
 
-    def set_pixel(self, x, y, color):
-        if 0 <= x < self.w and 0 <= y < self.h:
-            self.buffer[x][y] = color
+    @property
+    def title(self):
+        return self._title
 
-    def clear(self, color=(0, 0, 0)):
-        for x in range(self.w):
-            for y in range(self.h):
-                self.buffer[x][y] = color
+    @title.setter
+    def title(self, title):
+        self._title = title
+        self.mark_dirty(0, 0, self.w, self.TITLE_HEIGHT)
+
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, x):
+        self.move(x, self._y)
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, y):
+        self.move(self._x, y)
+
+    @property
+    def visible(self):
+        return self._visible
+
+    @visible.setter
+    def visible(self, visible):
+        if visible != self._visible:
+            old = self.rect()
+            self._visible = visible
+            self._placed(old)
+
+    def move(self, x, y):
+        if (x, y) != (self._x, self._y):
+            old = self.rect()
+            self._x, self._y = x, y
+            self._placed(old)
+
+    def _placed(self, old):
+        if self.manager is not None:
+            self.manager.window_placed(self, old)
+
+    @property
+    def w(self):
+        return self.width
+
+    @property
+    def h(self):
+        return self.height
+
+    def rect(self):
+        return (self.x, self.y, self.x + self.w, self.y + self.h)
+
+    def title_rect(self):
+        return (self.x, self.y, self.x + self.w, self.y + self.TITLE_HEIGHT)
+
+    def add_widget(self, widget):
+        self.widgets.append(widget)
+        self.widgets_dirty = True
+
+    def move_widget(self, widget, x, y):
+        """Move widget to window-relative (x, y), updating its hit-test entry.
+
+        Every widget is redrawn; the pixels in the area it leaves are the
+        guest's to repaint.
+        """
+        widget.x, widget.y = x, y
+        if self._indexed_widgets == len(self.widgets):
+            self._widget_grid.insert(self.widgets.index(widget), (x, y, x + widget.w, y + widget.h))
+        self.widgets_dirty = True
+
+    def reindex_widgets(self):
+        """Rebuild the widget hit-test index (call after removing widgets or changing them directly)."""
+        self._widget_grid.clear()
+        for i, widget in enumerate(self.widgets):
+            self._widget_grid.insert(i, (widget.x, widget.y, widget.x + widget.w, widget.y + widget.h))
+        self._indexed_widgets = len(self.widgets)
+
+    def widget_at(self, rel_x, rel_y):
+        """Return the first widget in list order under a window-relative point."""
+        if self._indexed_widgets != len(self.widgets):
+            self.reindex_widgets()
+        hits = self._widget_grid.query_point(rel_x, rel_y)
+        return self.widgets[min(hits)] if hits else None
+
+    def redraw_widget(self, widget):
+        """Repaint widget on the next frame (call after changing it in place)."""
+        if widget not in self._stale_widgets:
+            self._stale_widgets.append(widget)
+
+    def invalidate_widgets(self):
+        """Repaint every widget on the next frame."""
+        self.widgets_dirty = True
+
+    def widgets_pending(self):
+        """True if draw_widgets() has anything to paint, including widgets appended to the list directly."""
+        return self.widgets_dirty or bool(self._stale_widgets) or self._drawn_widgets != len(self.widgets)
 
     def close_button_hit(self, rel_x, rel_y):
         cx, cy = self.w + self.CLOSE_BTN_POS[0], self.CLOSE_BTN_POS[1]
@@ -145,42 +523,80 @@ class VirtualWindow:
         return cx <= rel_x < cx + cw and cy <= rel_y < cy + ch
 
     def draw_widgets(self):
-        for widget in self.widgets:
+        full = self.widgets_dirty or self._drawn_widgets != len(self.widgets)
+        for widget in self.widgets if full else self._stale_widgets:
+            # Widgets that repaint incrementally are told to paint everything.
+            if full and hasattr(widget, "invalidate"):
+                widget.invalidate()
             widget.draw(self)
+        self.widgets_dirty = False
+        self._drawn_widgets = len(self.widgets)
+        self._stale_widgets = []
 
-    def blit_to_fb(self, fb, focused=False):
+    def resize(self, width, height):
+        old = Surface(self.width, self.height)
+        old.buffer = self.buffer
+        self.width, self.height = width, height
+        self.buffer = bytearray(width * height * 3)
+        self.blit(old, 0, 0)
+        self.mark_dirty(0, 0, width, height)
+        self.widgets_dirty = True
+
+    def chrome(self, focused):
+        """Return the window decorations pre-rendered into a w x h surface.
+
+        The surface is rebuilt only when the size, focus state or title
+        changes; client-area pixels in it are unused.
+        """
+        key = (self.w, self.h, focused, self.title)
+        if self._chrome_key != key:
+            cx, cy = self.w + self.CLOSE_BTN_POS[0], self.CLOSE_BTN_POS[1]
+            cw, ch = self.CLOSE_BTN_SIZE
+            chrome = Surface(self.w, self.h)
+            chrome.fill_rect(0, 0, self.w, self.TITLE_HEIGHT, (50, 50, 100) if focused else (30, 30, 30))
+            chrome.draw_text(4, (self.TITLE_HEIGHT - GLYPH_HEIGHT) // 2, self.title, (255, 255, 255))
+            chrome.hline(0, 0, self.w, self.BORDER_COLOR)
+            chrome.hline(0, self.h - 1, self.w, self.BORDER_COLOR)
+            chrome.vline(0, 0, self.h, self.BORDER_COLOR)
+            chrome.vline(self.w - 1, 0, self.h, self.BORDER_COLOR)
+            chrome.fill_rect(cx, cy, cw, ch, self.CLOSE_BTN_COLOR)
+            for d in range(cw):
+                chrome.set_pixel(cx + d, cy + d, (255, 255, 255))
+                chrome.set_pixel(cx + d, cy + ch - 1 - d, (255, 255, 255))
+            self._chrome, self._chrome_key = chrome, key
+        return self._chrome
+
+    def blit_to_fb(self, fb, focused=False, clip=None):
         if not self.visible:
             return
 
-        border_color = (200, 200, 200)
-        title_height = 12
-        title_bg = (50, 50, 100) if focused else (30, 30, 30)
-        close_btn_color = (200, 60, 60)
-
-        for x in range(self.w):
-            for y in range(self.h):
-                tx = self.x + x
-                ty = self.y + y
-
-                if x == 0 or y == 0 or x == self.w - 1 or y == self.h - 1:
-                    fb.set_pixel(tx, ty, border_color)
-                elif y < title_height:
-                    fb.set_pixel(tx, ty, title_bg)
-                else:
-                    fb.set_pixel(tx, ty, self.buffer[x][y])
-
-        # Close button
-            for dx in range(6):
-                for dy in range(6):
-                    cx = self.x + self.w - 8 + dx
-                    cy = self.y + 3 + dy
-                    fb.set_pixel(cx, cy, close_btn_color)
-                    x_coords = [(0,0), (1,1), (2,2), (3,3), (4,4), (5,5)]
-                for dx, dy in x_coords:
-                    fb.set_pixel(self.x + self.w - 8 + dx, self.y + 3 + dy, (255, 255, 255))
-                    fb.set_pixel(self.x + self.w - 8 + dx, self.y + 3 + 5 - dy, (255, 255, 255))
-
-        self.draw_widgets()
+        area = self.rect() if clip is None else rect_intersect(self.rect(), clip)
+        if area is None:
+            return
+        area = rect_intersect(area, (0, 0, fb.width, fb.height))
+        if area is None:
+            return
+        x0, y0, x1, y1 = area
+
+        chrome = self.chrome(focused).buffer
+        lx0, lx1 = x0 - self.x, x1 - self.x
+        n = (lx1 - lx0) * 3
+        win_stride, fb_stride = self.w * 3, fb.width * 3
+        left = lx0 == 0
+        right = lx1 == self.w
+        for ty in range(y0, y1):
+            y = ty - self.y
+            si = y * win_stride + lx0 * 3
+            di = ty * fb_stride + x0 * 3
+            if y < self.TITLE_HEIGHT or y == self.h - 1:
+                fb.buffer[di:di + n] = chrome[si:si + n]
+                continue
+            # Client row: one copy from the window, then patch the side borders.
+            fb.buffer[di:di + n] = self.buffer[si:si + n]
+            if left:
+                fb.buffer[di:di + 3] = chrome[si:si + 3]
+            if right:
+                fb.buffer[di + n - 3:di + n] = chrome[si + n - 3:si + n]
 
 class WindowManager:
     def __init__(self, framebuffer):
@@ -188,112 +604,436 @@ class WindowManager:
         self.windows = {}
         self.next_id = 1
         self.focused_id = None
+        self.dragging_id = None
+        self.damage = Damage()
+        self.invalidate()
+        self.grid = SpatialGrid()
+        self.z = {}
+        self._z_top = 0
+        self.frame_listeners = []
 
     def create_window(self, x, y, w, h, title="Window"):
         win_id = self.next_id
         self.next_id += 1
         self.windows[win_id] = VirtualWindow(win_id, x, y, w, h, title)
-        self.focused_id = win_id
+        self.windows[win_id].manager = self
+        self._z_top += 1
+        self.z[win_id] = self._z_top
+        self.grid.insert(win_id, self.windows[win_id].rect())
+        self.damage.add(self.windows[win_id].rect())
+        self.set_focus(win_id)
         return win_id
 
+    def window_at(self, x, y):
+        """Return the id of the topmost visible window containing (x, y), or None."""
+        hits = [win_id for win_id in self.grid.query_point(x, y) if self.windows[win_id].visible]
+        return max(hits, key=self.z.__getitem__) if hits else None
+
     def get_window(self, win_id):
         return self.windows.get(win_id)
 
+    def invalidate(self, rect=None):
+        """Force rect (default: the whole screen) to be recomposited next frame."""
+        self.damage.add(rect or (0, 0, self.fb.width, self.fb.height))
+
+    def resize_window(self, win_id, w, h):
+        win = self.windows[win_id]
+        old = win.rect()
+        win.resize(w, h)
+        self.window_placed(win, old)
+
+    def window_placed(self, win, old):
+        """Update damage and the hit-test grid after win moved, resized or changed visibility.
+
+        VirtualWindow calls this itself when its x, y or visible change.
+        """
+        self.damage.add(old)
+        if win.visible:
+            self.grid.insert(win.id, win.rect())
+            self.damage.add(win.rect())
+        else:
+            self.grid.remove(win.id)
+
+    def set_focus(self, win_id):
+        if win_id == self.focused_id:
+            return
+        for old_id in (self.focused_id, win_id):
+            win = self.windows.get(old_id)
+            if win is not None:
+                self.damage.add(win.title_rect())
+        self.focused_id = win_id
+
     def draw_all(self):
+        """Recomposite the damaged parts of the screen.
+
+        Returns the list of screen rectangles that changed and need presenting;
+        an empty list means the frame is identical to the previous one. Each
+        callable in ``frame_listeners`` is called with that list whenever it
+        is not empty.
+        """
         self.cleanup_closed_windows()
-        self.fb.clear()
-        for win_id in self.windows:
-            focused = (win_id == self.focused_id)
-            self.windows[win_id].blit_to_fb(self.fb, focused=focused)
+        for win in self.windows.values():
+            if win.widgets_pending():
+                win.draw_widgets()
+            dirty = win.take_dirty()
+            if dirty and win.visible:
+                self.damage.add((dirty[0] + win.x, dirty[1] + win.y, dirty[2] + win.x, dirty[3] + win.y))
 
-    def handle_click(self, x, y):
-        for win_id in reversed(list(self.windows)):
+        screen = (0, 0, self.fb.width, self.fb.height)
+        rects = [r for r in (rect_intersect(r, screen) for r in self.damage.take()) if r]
+        # Pixels written straight into the framebuffer are presented as-is.
+        direct = self.fb.take_dirty()
+
+        for rect in rects:
+            self.compose(rect)
+        self.fb.dirty = None
+
+        if direct:
+            rects.append(direct)
+        if rects:
+            for listener in self.frame_listeners:
+                listener(rects)
+        return rects
+
+    def compose(self, rect):
+        """Paint one screen rectangle, drawing each pixel exactly once.
+
+        Windows are visited front to back. Each one blits only the part of the
+        still-uncovered region it overlaps and then removes its rectangle from
+        that region, so fully covered windows are never touched. Whatever is
+        left at the end is desktop background.
+        """
+        region = [rect]
+        for win_id in reversed(self.windows):
             win = self.windows[win_id]
             if not win.visible:
                 continue
-            if win.x <= x < win.x + win.w and win.y <= y < win.y + win.h:
-                rel_x = x - win.x
-                rel_y = y - win.y
-
-                if win.close_button_hit(rel_x, rel_y):
-                    win.should_close = True
-                    return None
-
-                for widget in win.widgets:
-                    if widget.handle_click(rel_x, rel_y):
-                        self.bring_to_front(win_id)
-                        return win_id
-
-                self.focused_id = win_id
-                self.bring_to_front(win_id)
-                win.dragging = True
-                win.drag_offset = (x - win.x, y - win.y)
-                return win_id
-        return None
+            win_rect = win.rect()
+            remaining = []
+            for r in region:
+                visible = rect_intersect(r, win_rect)
+                if visible is None:
+                    remaining.append(r)
+                    continue
+                win.blit_to_fb(self.fb, focused=(win_id == self.focused_id), clip=visible)
+                remaining.extend(rect_subtract(r, win_rect))
+            region = remaining
+            if not region:
+                break
+        for r in region:
+            self.fb.clear_rect(r)
+
+    def handle_click(self, x, y):
+        win_id = self.window_at(x, y)
+        if win_id is None:
+            return None
+        win = self.windows[win_id]
+        rel_x = x - win.x
+        rel_y = y - win.y
+
+        if win.close_button_hit(rel_x, rel_y):
+            win.should_close = True
+            return None
+
+        widget = win.widget_at(rel_x, rel_y)
+        if widget is not None and widget.handle_click(rel_x, rel_y):
+            self.bring_to_front(win_id)
+            return win_id
+
+        self.set_focus(win_id)
+        self.bring_to_front(win_id)
+        win.dragging = True
+        win.drag_offset = (x - win.x, y - win.y)
+        self.dragging_id = win_id
+        return win_id
 
     def handle_mouse_release(self):
-        for win in self.windows.values():
+        win = self.windows.get(self.dragging_id)
+        if win is not None:
             win.dragging = False
+        self.dragging_id = None
 
     def handle_mouse_move(self, x, y):
-        for win in self.windows.values():
-            if win.dragging:
-                dx, dy = win.drag_offset
-                win.x = x - dx
-                win.y = y - dy
+        win = self.windows.get(self.dragging_id)
+        if win is not None and win.dragging:
+            dx, dy = win.drag_offset
+            win.move(x - dx, y - dy)
 
-            if self.focused_id == win.id and win.visible:
-                rel_x = x - win.x
-                rel_y = y - win.y
-                for widget in win.widgets:
-                    widget.handle_hover(rel_x, rel_y)
+        win = self.windows.get(self.focused_id)
+        if win is not None and win.visible:
+            rel_x = x - win.x
+            rel_y = y - win.y
+            widget = win.widget_at(rel_x, rel_y)
+            if widget is not win.hovered:
+                for changed in (win.hovered, widget):
+                    if changed is not None:
+                        changed.handle_hover(rel_x, rel_y)
+                        win.redraw_widget(changed)
+                win.hovered = widget
 
     def bring_to_front(self, win_id):
-        if win_id in self.windows:
+        if win_id in self.windows and next(reversed(self.windows)) != win_id:
             win = self.windows.pop(win_id)
             self.windows[win_id] = win
+            self._z_top += 1
+            self.z[win_id] = self._z_top
+            self.damage.add(win.rect())
 
     def cleanup_closed_windows(self):
         to_remove = [win_id for win_id, win in self.windows.items() if win.should_close]
         for win_id in to_remove:
-            del self.windows[win_id]
+            win = self.windows.pop(win_id)
+            win.manager = None
+            self.damage.add(win.rect())
+            del self.z[win_id]
+            self.grid.remove(win_id)
             if self.focused_id == win_id:
                 self.focused_id = None
-canvas = tk.Canvas(root, width=fb.width, height=fb.height)
-canvas.pack()
+            if self.dragging_id == win_id:
+                self.dragging_id = None
+
+class FrameStats:
+    """Frame timing for the presentation loop.
+
+    ``present_*`` is the time spent pushing damaged pixels to Tk. A frame
+    that runs more than ``budget`` seconds after it was scheduled (or, without
+    a schedule, after the previous tick) counts the frames it skipped as
+    dropped.
+    """
+
+    def __init__(self, budget=0.030):
+        self.budget = budget
+        self.frames = 0
+        self.presented = 0
+        self.dropped = 0
+        self.present_last = 0.0
+        self.present_max = 0.0
+        self.present_total = 0.0
+        self._last_tick = None
+
+    def tick(self, scheduled=None):
+        now = time.perf_counter()
+        if scheduled is not None:
+            late = now - scheduled
+            if late > self.budget:
+                self.dropped += int(late / self.budget)
+        elif self._last_tick is not None:
+            late = now - self._last_tick
+            if late > self.budget * 1.5:
+                self.dropped += int(late / self.budget) - 1
+        self._last_tick = now
+        self.frames += 1
+
+    def record_present(self, seconds):
+        self.presented += 1
+        self.present_last = seconds
+        self.present_total += seconds
+        self.present_max = max(self.present_max, seconds)
+
+    def report(self):
+        return {
+            "frames": self.frames,
+            "presented": self.presented,
+            "dropped": self.dropped,
+            "present_last_ms": self.present_last * 1000,
+            "present_avg_ms": self.present_total / self.presented * 1000 if self.presented else 0.0,
+            "present_max_ms": self.present_max * 1000,
+        }
+
+class Display:
+    """Shows a FrameBuffer on a Tk canvas through one long-lived PhotoImage.
+
+    The canvas item and PhotoImage are created once; each present() converts
+    only the damaged rectangles and copies them into the photo in place.
+    With an integer ``scale`` the photo is that many times larger and each
+    damaged rectangle is enlarged on its own, so a 4x view only costs more
+    in proportion to what changed.
+    """
+
+    def __init__(self, canvas, fb, budget=0.030, scale=1):
+        self.canvas = canvas
+        self.fb = fb
+        self.scale = scale
+        self.photo = ImageTk.PhotoImage(fb.to_image(scale=scale))
+        self.item = canvas.create_image(0, 0, image=self.photo, anchor=tk.NW)
+        self.stats = FrameStats(budget)
+
+    def to_fb(self, x, y):
+        """Map canvas coordinates back to framebuffer coordinates."""
+        return x // self.scale, y // self.scale
+
+    def present(self, rects, scheduled=None):
+        self.stats.tick(scheduled)
+        if not rects:
+            return
+        start = time.perf_counter()
+        for rect in rects:
+            patch = ImageTk.PhotoImage(self.fb.to_image(rect, self.scale))
+            self.canvas.tk.call(str(self.photo), "copy", str(patch), "-to", rect[0] * self.scale, rect[1] * self.scale)
+        self.stats.record_present(time.perf_counter() - start)
+
+class FrameScheduler:
+    """Runs frames on a Tk root only when needed, capped at ``fps``.
+
+    Mouse motion is buffered and applied once per frame, so a burst of
+    <B1-Motion> events costs one handle_mouse_move. A frame that presents
+    damage schedules the next one at the frame rate; idle frames back off
+    exponentially to ``idle_interval`` until input or request_frame() wakes
+    the loop again.
+    """
+
+    def __init__(self, root, wm, display, fps=30, idle_interval=0.25):
+        self.root = root
+        self.wm = wm
+        self.display = display
+        self.frame_time = 1.0 / fps
+        self.idle_interval = idle_interval
+        self.pending_motion = None
+        self._idle_delay = self.frame_time
+        self._last_frame = 0.0
+        self._after_id = None
+        self._due = None
+
+    def request_frame(self):
+        self._idle_delay = self.frame_time
+        self._schedule(max(0.0, self._last_frame + self.frame_time - time.perf_counter()))
 
-def on_click(event):
-    x, y = event.x, event.y
-    wm.handle_click(x, y)
+    def on_click(self, x, y):
+        self.flush_motion()
+        self.wm.handle_click(x, y)
+        self.request_frame()
 
-def on_motion(event):
-    x, y = event.x, event.y
-    wm.handle_mouse_move(x, y)
+    def on_motion(self, x, y):
+        self.pending_motion = (x, y)
+        self.request_frame()
+
+    def on_release(self):
+        self.flush_motion()
+        self.wm.handle_mouse_release()
+        self.request_frame()
+
+    def flush_motion(self):
+        if self.pending_motion is not None:
+            x, y = self.pending_motion
+            self.pending_motion = None
+            self.wm.handle_mouse_move(x, y)
+
+    def _schedule(self, delay):
+        due = time.perf_counter() + delay
+        if self._after_id is not None:
+            if self._due <= due:
+                return
+            self.root.after_cancel(self._after_id)
+        self._due = due
+        self._after_id = self.root.after(int(delay * 1000), self._frame)
+
+    def _frame(self):
+        scheduled, self._after_id = self._due, None
+        self._last_frame = time.perf_counter()
+        self.flush_motion()
+        rects = self.wm.draw_all()
+        self.display.present(rects, scheduled)
+        if rects:
+            self._idle_delay = self.frame_time
+        else:
+            self._idle_delay = min(self._idle_delay * 2, self.idle_interval)
+        self._schedule(self._idle_delay if not rects else self.frame_time)
+
+class HeadlessDisplay:
+    """Display stand-in for machines without Tk.
+
+    Same present() interface as Display. Each presented frame is kept as raw
+    RGB bytes in ``last_frame`` and, with ``out_dir``, also written there as
+    frame_NNNNN.ppm (or .png).
+    """
+
+    def __init__(self, fb, out_dir=None, fmt="ppm", budget=0.030):
+        self.fb = fb
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.stats = FrameStats(budget)
+        self.frame_no = 0
+        self.last_frame = None
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+
+    def present(self, rects, scheduled=None):
+        self.stats.tick(scheduled)
+        if not rects:
+            return
+        start = time.perf_counter()
+        self.last_frame = self.fb.to_bytes()
+        if self.out_dir:
+            self.fb.save(os.path.join(self.out_dir, f"frame_{self.frame_no:05d}.{self.fmt}"))
+        self.frame_no += 1
+        self.stats.record_present(time.perf_counter() - start)
+
+def screen_scale(root):
+    """Pick an integer scale (1-4) from the screen's DPI, taking 96 DPI as 1x."""
+    return max(1, min(4, round(root.winfo_fpixels("1i") / 96)))
+
+def build_demo(wm):
+    # Example windows/buttons to test:
+    win_id = wm.create_window(20, 20, 150, 100, "Test Win")
+
+    # Add a button inside the window
+    def on_button_click():
+        print("Button clicked!")
+
+    button = Button(10, 30, 60, 15, "Click", callback=on_button_click)
+    wm.get_window(win_id).add_widget(button)
+    return win_id
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PyBox framebuffer demo")
+    parser.add_argument("--headless", action="store_true", help="render without Tk")
+    parser.add_argument("--frames", type=int, default=30, help="frames to render in headless mode")
+    parser.add_argument("--out", help="directory to write headless frames to")
+    parser.add_argument("--scale", type=int, choices=(0, 1, 2, 3, 4), default=0,
+                        help="integer window scale; 0 picks one from the screen DPI")
+    args = parser.parse_args(argv)
+
+    fb = FrameBuffer(320, 240)
+    wm = WindowManager(fb)
+    build_demo(wm)
+
+    if args.headless:
+        display = HeadlessDisplay(fb, args.out)
+        # Drag the demo window so every frame carries some damage.
+        wm.handle_click(25, 25)
+        for i in range(args.frames):
+            wm.handle_mouse_move(25 + i, 25 + i // 2)
+            display.present(wm.draw_all())
+        wm.handle_mouse_release()
+        print(json.dumps(display.stats.report()))
+        return
 
-def on_release(event):
-    wm.handle_mouse_release()
+    if tk is None:
+        raise RuntimeError("Tk display needs tkinter and Pillow's ImageTk; use --headless")
+    root = tk.Tk()
+    scale = args.scale or screen_scale(root)
+    canvas = tk.Canvas(root, width=fb.width * scale, height=fb.height * scale)
+    canvas.pack()
+    display = Display(canvas, fb, scale=scale)
+    scheduler = FrameScheduler(root, wm, display)
 
-canvas.bind("<Button-1>", on_click)
-canvas.bind("<B1-Motion>", on_motion)
-canvas.bind("<ButtonRelease-1>", on_release)
+    def on_click(event):
+        x, y = display.to_fb(event.x, event.y)
+        scheduler.on_click(x, y)
 
-def update():
-    wm.draw_all()
-    img = fb.to_image()
-    photo = ImageTk.PhotoImage(img)
-    canvas.create_image(0, 0, image=photo, anchor=tk.NW)
-    canvas.image = photo  # prevent GC
-    root.after(30, update)
+    def on_motion(event):
+        x, y = display.to_fb(event.x, event.y)
+        scheduler.on_motion(x, y)
 
-# Example windows/buttons to test:
-win_id = wm.create_window(20, 20, 150, 100, "Test Win")
+    def on_release(event):
+        scheduler.on_release()
 
-# Add a button inside the window
-def on_button_click():
-    print("Button clicked!")
+    canvas.bind("<Button-1>", on_click)
+    canvas.bind("<B1-Motion>", on_motion)
+    canvas.bind("<ButtonRelease-1>", on_release)
 
-button = Button(10, 30, 60, 15, "Click", callback=on_button_click)
-wm.get_window(win_id).widgets.append(button)
+    scheduler.request_frame()
+    root.mainloop()
 
-update()
-root.mainloop()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
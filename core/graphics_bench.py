@@ -0,0 +1,152 @@
+"""Headless micro-benchmarks for the framebuffer and compositor.
+
+Run from the repository root:
+
+    python -m core.graphics_bench --out bench.json
+
+Each benchmark reports the best time per call over several repeats, plus a
+derived throughput where one makes sense. Results are written as JSON so runs
+can be diffed to spot regressions.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from .graphics import Button, FrameBuffer, VirtualWindow, WindowManager, Image
+
+WIDTH, HEIGHT = 320, 240
+
+
+def best_of(fn, number, repeat=5):
+    """Return the best average seconds per call of fn over repeat runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def bench_set_pixel():
+    fb = FrameBuffer(WIDTH, HEIGHT)
+    coords = [(x, y) for y in range(0, HEIGHT, 4) for x in range(0, WIDTH, 4)]
+    color = (200, 100, 50)
+
+    def run():
+        for x, y in coords:
+            fb.set_pixel(x, y, color)
+
+    seconds = best_of(run, 5)
+    return {"seconds": seconds, "pixels_per_sec": len(coords) / seconds}
+
+
+def bench_clear():
+    fb = FrameBuffer(WIDTH, HEIGHT)
+    seconds = best_of(lambda: fb.clear((10, 20, 30)), 200)
+    return {"seconds": seconds, "pixels_per_sec": WIDTH * HEIGHT / seconds}
+
+
+def bench_blit_to_fb():
+    fb = FrameBuffer(WIDTH, HEIGHT)
+    win = VirtualWindow(1, 10, 10, 200, 150, "Bench")
+    seconds = best_of(lambda: win.blit_to_fb(fb, focused=True), 200)
+    return {"seconds": seconds, "pixels_per_sec": win.w * win.h / seconds}
+
+
+def bench_draw_all(n_windows):
+    rng = random.Random(n_windows)
+    fb = FrameBuffer(WIDTH, HEIGHT)
+    wm = WindowManager(fb)
+    for i in range(n_windows):
+        win_id = wm.create_window(
+            rng.randint(-20, WIDTH - 40), rng.randint(-20, HEIGHT - 30),
+            rng.randint(40, 160), rng.randint(30, 120), f"W{i}",
+        )
+        wm.get_window(win_id).add_widget(Button(5, 15, 30, 12, "OK"))
+    wm.draw_all()
+
+    def full_frame():
+        wm.invalidate()
+        wm.draw_all()
+
+    idle = best_of(wm.draw_all, 200)
+    full = best_of(full_frame, 20)
+    return {"seconds": full, "fps": 1 / full, "idle_seconds": idle}
+
+
+def bench_text():
+    fb = FrameBuffer(WIDTH, HEIGHT)
+    text = "THE QUICK BROWN FOX JUMPS"
+    seconds = best_of(lambda: fb.draw_text(4, 4, text, (255, 255, 255)), 1000)
+    return {"seconds": seconds, "chars_per_sec": len(text) / seconds}
+
+
+def bench_to_image():
+    if Image is None:
+        return {"skipped": "Pillow is not installed"}
+    fb = FrameBuffer(WIDTH, HEIGHT)
+    return {"seconds": best_of(fb.to_image, 200)}
+
+
+def bench_to_image_scaled(scale):
+    if Image is None:
+        return {"skipped": "Pillow is not installed"}
+    fb = FrameBuffer(WIDTH, HEIGHT)
+    return {"seconds": best_of(lambda: fb.to_image(scale=scale), 100)}
+
+
+def bench_to_bytes():
+    fb = FrameBuffer(WIDTH, HEIGHT)
+    return {"seconds": best_of(fb.to_bytes, 200)}
+
+
+BENCHMARKS = {
+    "set_pixel": bench_set_pixel,
+    "clear": bench_clear,
+    "blit_to_fb": bench_blit_to_fb,
+    "draw_all_5": lambda: bench_draw_all(5),
+    "draw_all_25": lambda: bench_draw_all(25),
+    "draw_all_100": lambda: bench_draw_all(100),
+    "draw_text": bench_text,
+    "to_image": bench_to_image,
+    "to_image_2x": lambda: bench_to_image_scaled(2),
+    "to_image_4x": lambda: bench_to_image_scaled(4),
+    "to_bytes": bench_to_bytes,
+}
+
+
+def run(names=None):
+    results = {}
+    for name, fn in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        results[name] = fn()
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "framebuffer": [WIDTH, HEIGHT],
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PyBox graphics benchmarks")
+    parser.add_argument("--out", help="write JSON results to this file instead of stdout")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    args = parser.parse_args(argv)
+
+    report = run(args.names)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
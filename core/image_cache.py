@@ -0,0 +1,124 @@
+"""Decoded image assets for guests, kept in the framebuffer's pixel format.
+
+Images are decoded once with Pillow into a Sprite (a Surface, so blits are
+row-slice copies) and kept in a byte-bounded LRU. Scaled variants are cached
+next to the originals. Colorkey transparency is handled by precomputing,
+per row, the runs of opaque pixels, so a keyed blit is one slice copy per run.
+"""
+import io
+from collections import OrderedDict
+
+from .graphics import Image, Surface, rect_intersect
+
+
+class Sprite(Surface):
+    def __init__(self, width, height, data=None):
+        super().__init__(width, height)
+        if data is not None:
+            self.buffer[:] = data
+        self._runs = {}
+
+    @property
+    def nbytes(self):
+        return len(self.buffer)
+
+    def opaque_runs(self, colorkey):
+        """Return, per row, the (start, end) column runs whose color is not colorkey."""
+        colorkey = tuple(colorkey)
+        runs = self._runs.get(colorkey)
+        if runs is None:
+            key = bytes(colorkey)
+            buf = self.buffer
+            stride = self.width * 3
+            runs = []
+            for y in range(self.height):
+                row = []
+                start = None
+                base = y * stride
+                for x in range(self.width):
+                    i = base + x * 3
+                    if buf[i:i + 3] == key:
+                        if start is not None:
+                            row.append((start, x))
+                            start = None
+                    elif start is None:
+                        start = x
+                if start is not None:
+                    row.append((start, self.width))
+                runs.append(row)
+            self._runs[colorkey] = runs
+        return runs
+
+    def scaled(self, factor):
+        """Return a nearest-neighbour scaled copy."""
+        width = max(1, round(self.width * factor))
+        height = max(1, round(self.height * factor))
+        img = Image.frombuffer("RGB", (self.width, self.height), self.buffer, "raw", "RGB", 0, 1)
+        return Sprite(width, height, img.resize((width, height), resample=Image.NEAREST).tobytes())
+
+
+def decode(data):
+    if Image is None:
+        raise RuntimeError("Pillow is not installed")
+    img = Image.open(io.BytesIO(data)).convert("RGB")
+    return Sprite(img.width, img.height, img.tobytes())
+
+
+def blit_sprite(dest, sprite, x, y, colorkey=None):
+    """Draw sprite onto surface dest at (x, y), skipping colorkey pixels if given."""
+    if colorkey is None:
+        dest.blit(sprite, x, y)
+        return
+    area = rect_intersect((x, y, x + sprite.width, y + sprite.height), (0, 0, dest.width, dest.height))
+    if area is None:
+        return
+    x0, y0, x1, y1 = area
+    src, dst = sprite.buffer, dest.buffer
+    src_stride, dst_stride = sprite.width * 3, dest.width * 3
+    runs = sprite.opaque_runs(colorkey)
+    for ty in range(y0, y1):
+        sy = ty - y
+        for start, end in runs[sy]:
+            lo, hi = max(start + x, x0), min(end + x, x1)
+            if lo >= hi:
+                continue
+            si = sy * src_stride + (lo - x) * 3
+            di = ty * dst_stride + lo * 3
+            dst[di:di + (hi - lo) * 3] = src[si:si + (hi - lo) * 3]
+    dest.mark_dirty(x0, y0, x1, y1)
+
+
+class ImageCache:
+    """Size-bounded LRU of decoded sprites keyed by (path, version, scale).
+
+    ``version`` identifies the file's contents (a digest, say), so a path
+    that is rewritten is decoded again instead of serving the old pixels.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._sprites = OrderedDict()
+
+    def get(self, path, read, scale=1, version=None):
+        """Return the sprite for path at scale, calling read(path) -> bytes on a miss."""
+        key = (path, version, scale)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+        self.misses += 1
+        sprite = decode(read(path)) if scale == 1 else self.get(path, read, 1, version).scaled(scale)
+        self._sprites[key] = sprite
+        self.total_bytes += sprite.nbytes
+        while self.total_bytes > self.max_bytes and len(self._sprites) > 1:
+            _, old = self._sprites.popitem(last=False)
+            self.total_bytes -= old.nbytes
+        return sprite
+
+    def discard(self, path):
+        for key in [k for k in self._sprites if k[0] == path]:
+            self.total_bytes -= self._sprites.pop(key).nbytes
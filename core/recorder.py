@@ -0,0 +1,246 @@
+"""Delta-compressed recording and playback of framebuffer sessions.
+
+SessionRecorder hooks into WindowManager.draw_all. On the GUI thread it
+only copies the framebuffer, one bytes() call per changed frame. At most
+``max_pending`` copies wait for the encoder; when it falls behind, a new
+frame replaces the newest waiting one (their damage rectangles are merged),
+so memory stays bounded and only intermediate frames are lost. A background
+thread diffs that copy against the previous frame in 16x16 tiles and
+stores only the changed tiles, zlib-compressed and XORed against their
+previous contents. Every ``keyframe_interval`` frames a full compressed
+frame is stored so playback can seek without replaying the whole session.
+With a path, records go straight to the file and only their offsets stay in
+memory; without one they are kept in ``records``.
+
+File layout (little endian):
+    header  MAGIC, width, height, tile, keyframe_interval
+    records timestamp (double), kind (byte), payload length, payload
+    index   offset of every record, then index offset, record count, MAGIC
+
+A keyframe payload is the zlib-compressed frame. A delta payload is a tile
+count followed by (tx, ty, length, data) per changed tile.
+"""
+from collections import deque
+import struct
+import threading
+import time
+import zlib
+
+from .tiles import TILE, changed_tiles, decode_tile, encode_tile, read_tile, tile_rect, write_tile
+
+MAGIC = b"PBREC1\0\0"
+HEADER = struct.Struct("<8sHHHH")
+RECORD = struct.Struct("<dBI")
+FOOTER = struct.Struct("<QI8s")
+TILE_HEADER = struct.Struct("<HHI")
+KEYFRAME, DELTA = 0, 1
+
+
+class SessionRecorder:
+    def __init__(self, fb, path=None, tile=TILE, keyframe_interval=60, max_pending=4):
+        self.width = fb.width
+        self.height = fb.height
+        self.fb = fb
+        self.path = path
+        self.tile = tile
+        self.keyframe_interval = keyframe_interval
+        self.records = []
+        self.count = 0
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._prev = None
+        self._pending = deque()
+        self._ready = threading.Condition()
+        self._file = None
+        self._offsets = []
+        if path:
+            self._file = open(path, "wb")
+            self._file.write(HEADER.pack(MAGIC, self.width, self.height, tile, keyframe_interval))
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def attach(self, wm):
+        """Capture every frame that wm.draw_all() composites."""
+        wm.frame_listeners.append(self.capture)
+        return self
+
+    def capture(self, rects=None):
+        """Queue the current framebuffer contents; rects narrows the tile search."""
+        item = (time.time(), self.fb.to_bytes(), rects)
+        with self._ready:
+            if len(self._pending) >= self.max_pending:
+                # The encoder is behind: the newest waiting frame is superseded.
+                _, _, pending_rects = self._pending.pop()
+                if pending_rects is None or rects is None:
+                    item = item[:2] + (None,)
+                else:
+                    item = item[:2] + (list(pending_rects) + list(rects),)
+                self.dropped += 1
+            self._pending.append(item)
+            self._ready.notify()
+
+    def flush(self):
+        if self._file:
+            self._file.flush()
+
+    def close(self):
+        with self._ready:
+            self._pending.append(None)
+            self._ready.notify()
+        self._thread.join()
+        if self._file:
+            index_offset = self._file.tell()
+            self._file.write(struct.pack(f"<{len(self._offsets)}Q", *self._offsets))
+            self._file.write(FOOTER.pack(index_offset, len(self._offsets), MAGIC))
+            self._file.close()
+            self._file = None
+
+    def _run(self):
+        while True:
+            with self._ready:
+                while not self._pending:
+                    self._ready.wait()
+                item = self._pending.popleft()
+            if item is None:
+                return
+            timestamp, frame, rects = item
+            if self._prev is None or self.count % self.keyframe_interval == 0:
+                record = (timestamp, KEYFRAME, zlib.compress(frame, 1))
+            else:
+                parts = []
+                for tx, ty in changed_tiles(self._prev, frame, self.width, self.height, self.tile, rects):
+                    rect = tile_rect(tx, ty, self.width, self.height, self.tile)
+                    data = encode_tile(read_tile(frame, self.width, rect), read_tile(self._prev, self.width, rect))
+                    parts.append(TILE_HEADER.pack(tx, ty, len(data)) + data)
+                if not parts:
+                    continue
+                record = (timestamp, DELTA, struct.pack("<I", len(parts)) + b"".join(parts))
+            self._prev = frame
+            self._store(record)
+
+    def _store(self, record):
+        if self._file:
+            timestamp, kind, payload = record
+            offset = self._file.tell()
+            self._file.write(RECORD.pack(timestamp, kind, len(payload)))
+            self._file.write(payload)
+            self._offsets.append(offset)
+        else:
+            self.records.append(record)
+        self.count += 1
+
+
+class RecordFile:
+    """Read-only sequence of (timestamp, kind, payload) records, read from a recording on demand."""
+
+    def __init__(self, path, offsets):
+        self.offsets = offsets
+        self._file = open(path, "rb")
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, n):
+        self._file.seek(self.offsets[n])
+        timestamp, kind, length = RECORD.unpack(self._file.read(RECORD.size))
+        return timestamp, kind, self._file.read(length)
+
+    def close(self):
+        self._file.close()
+
+
+class SessionPlayer:
+    """Random access over a recording, from a file path, a recorder or a list of records.
+
+    A recorder that streams to a file is read back from that file, up to the
+    last record it had written when the player was created.
+    """
+
+    def __init__(self, source, width=None, height=None, tile=TILE):
+        if isinstance(source, str):
+            self.records, self.width, self.height, self.tile = self._load(source)
+        else:
+            if getattr(source, "path", None):
+                offsets = list(source._offsets)
+                source.flush()
+                self.records = RecordFile(source.path, offsets)
+            else:
+                self.records = source.records if hasattr(source, "records") else list(source)
+            self.width = width if width is not None else source.width
+            self.height = height if height is not None else source.height
+            self.tile = getattr(source, "tile", tile)
+        self._pos = None
+        self._frame = None
+
+    def __len__(self):
+        return len(self.records)
+
+    def close(self):
+        if isinstance(self.records, RecordFile):
+            self.records.close()
+
+    @staticmethod
+    def _load(path):
+        """Read the header and record index of a recording; payloads stay on disk."""
+        with open(path, "rb") as f:
+            magic, width, height, tile, _ = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"'{path}' is not a PyBox session recording")
+            size = f.seek(0, 2)
+            footer_magic = None
+            if size >= HEADER.size + FOOTER.size:
+                f.seek(size - FOOTER.size)
+                index_offset, count, footer_magic = FOOTER.unpack(f.read(FOOTER.size))
+            if footer_magic == MAGIC:
+                f.seek(index_offset)
+                offsets = list(struct.unpack(f"<{count}Q", f.read(count * 8)))
+            else:
+                # Recording was not closed cleanly: rebuild the index by scanning the record headers.
+                offsets, pos = [], HEADER.size
+                while pos + RECORD.size <= size:
+                    f.seek(pos)
+                    length = RECORD.unpack(f.read(RECORD.size))[2]
+                    if pos + RECORD.size + length > size:
+                        break
+                    offsets.append(pos)
+                    pos += RECORD.size + length
+        return RecordFile(path, offsets), width, height, tile
+
+    def timestamp(self, n):
+        return self.records[n][0]
+
+    def seek(self, n):
+        """Return frame n as packed RGB bytes."""
+        if not 0 <= n < len(self.records):
+            raise IndexError(f"frame {n} out of range")
+        key = n
+        while self.records[key][1] != KEYFRAME:
+            key -= 1
+        if self._pos is not None and key <= self._pos <= n:
+            start, frame = self._pos + 1, self._frame
+        else:
+            start, frame = key + 1, bytearray(zlib.decompress(self.records[key][2]))
+        for i in range(start, n + 1):
+            self._apply(frame, self.records[i])
+        self._pos, self._frame = n, frame
+        return bytes(frame)
+
+    def _apply(self, frame, record):
+        _, kind, payload = record
+        if kind == KEYFRAME:
+            frame[:] = zlib.decompress(payload)
+            return
+        count = struct.unpack_from("<I", payload)[0]
+        pos = 4
+        for _ in range(count):
+            tx, ty, length = TILE_HEADER.unpack_from(payload, pos)
+            pos += TILE_HEADER.size
+            rect = tile_rect(tx, ty, self.width, self.height, self.tile)
+            prev = read_tile(frame, self.width, rect)
+            write_tile(frame, self.width, rect, decode_tile(payload[pos:pos + length], prev))
+            pos += length
+
+    def show(self, n, fb):
+        """Load frame n into a FrameBuffer of the recording's size."""
+        fb.buffer[:] = self.seek(n)
+        fb.mark_dirty(0, 0, fb.width, fb.height)
@@ -0,0 +1,128 @@
+"""Framebuffer shared between a guest VM process and the PyBox host.
+
+The host creates a small memory-mapped file holding a control block followed
+by the RGB pixels, and hands its path to the guest in the PYBOX_FB
+environment variable. The guest draws into it like any FrameBuffer and calls
+publish() after each frame. The host calls poll() to find out which region
+changed. Pixels never go through a pipe.
+
+Control block (little endian, HEADER_SIZE bytes):
+    magic "PBFB", version, width, height, frame counter, ack counter and
+    the dirty rectangle (x0, y0, x1, y1) accumulated since the host's last ack.
+"""
+import mmap
+import os
+import struct
+import tempfile
+
+from .graphics import FrameBuffer
+
+ENV_VAR = "PYBOX_FB"
+MAGIC = b"PBFB"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHxxQQiiii")
+HEADER_SIZE = 64
+_FRAME_OFFSET = 12
+_ACK_OFFSET = 20
+_RECT = struct.Struct("<iiii")
+_RECT_OFFSET = 28
+_COUNTER = struct.Struct("<Q")
+
+
+class SharedFrameBuffer(FrameBuffer):
+    """A FrameBuffer whose pixels live in a memory-mapped file.
+
+    Use create() on the host and attach() (or from_env()) in the guest.
+    """
+
+    def __init__(self, path, mm, width, height, owner=False):
+        self.path = path
+        self.owner = owner
+        self._mm = mm
+        self._view = memoryview(mm)
+        self.width = width
+        self.height = height
+        self.buffer = self._view[HEADER_SIZE:HEADER_SIZE + width * height * 3]
+        self.dirty = None
+        self._seen = 0
+
+    @classmethod
+    def create(cls, width, height, path=None):
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="pybox-fb-", suffix=".raw")
+            os.close(fd)
+        size = HEADER_SIZE + width * height * 3
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, width, height, 0, 0, 0, 0, 0, 0))
+            f.truncate(size)
+        with open(path, "r+b") as f:
+            mm = mmap.mmap(f.fileno(), size)
+        return cls(path, mm, width, height, owner=True)
+
+    @classmethod
+    def attach(cls, path):
+        with open(path, "r+b") as f:
+            mm = mmap.mmap(f.fileno(), 0)
+        magic, version, width, height = HEADER.unpack_from(mm)[:4]
+        if magic != MAGIC or version != VERSION:
+            mm.close()
+            raise ValueError(f"'{path}' is not a PyBox framebuffer")
+        return cls(path, mm, width, height)
+
+    @classmethod
+    def from_env(cls):
+        """Attach to the framebuffer the host passed in PYBOX_FB, or return None."""
+        path = os.environ.get(ENV_VAR)
+        return cls.attach(path) if path else None
+
+    @property
+    def frame(self):
+        return _COUNTER.unpack_from(self._mm, _FRAME_OFFSET)[0]
+
+    def publish(self, rects=None):
+        """Announce a finished frame (guest side).
+
+        rects is the list of changed rectangles, e.g. from WindowManager.draw_all();
+        by default the buffer's own dirty box is used. Damage the host has not
+        acknowledged yet is merged in, so a slow host never misses a region.
+        """
+        if rects is None:
+            dirty = self.take_dirty()
+            rects = [dirty] if dirty else []
+        if not rects:
+            return
+        x0 = min(r[0] for r in rects)
+        y0 = min(r[1] for r in rects)
+        x1 = max(r[2] for r in rects)
+        y1 = max(r[3] for r in rects)
+        frame = self.frame
+        if _COUNTER.unpack_from(self._mm, _ACK_OFFSET)[0] != frame:
+            px0, py0, px1, py1 = _RECT.unpack_from(self._mm, _RECT_OFFSET)
+            if px0 < px1 and py0 < py1:
+                x0, y0, x1, y1 = min(x0, px0), min(y0, py0), max(x1, px1), max(y1, py1)
+        _RECT.pack_into(self._mm, _RECT_OFFSET, x0, y0, x1, y1)
+        _COUNTER.pack_into(self._mm, _FRAME_OFFSET, frame + 1)
+
+    def poll(self):
+        """Return the rectangle changed since the last poll, or None (host side)."""
+        frame = self.frame
+        if frame == self._seen:
+            return None
+        rect = _RECT.unpack_from(self._mm, _RECT_OFFSET)
+        _COUNTER.pack_into(self._mm, _ACK_OFFSET, frame)
+        self._seen = frame
+        x0, y0 = max(rect[0], 0), max(rect[1], 0)
+        x1, y1 = min(rect[2], self.width), min(rect[3], self.height)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return (x0, y0, x1, y1)
+
+    def close(self):
+        self.buffer.release()
+        self._view.release()
+        self._mm.close()
+        if self.owner:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
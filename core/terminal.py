@@ -0,0 +1,128 @@
+"""Framebuffer text console widget for VirtualWindow."""
+from collections import deque
+
+from .font import ADVANCE, GLYPH_HEIGHT
+
+
+class Terminal:
+    """A character-cell console drawn with the pixel font.
+
+    write() only updates the cell grid and remembers what changed, so a
+    guest can push thousands of lines between frames. On the next draw the
+    widget scrolls its pixels in place by the number of lines that scrolled
+    off, then redraws only the changed cell spans. If a whole screen or more
+    scrolled by, it repaints once.
+
+    Lines are numbered absolutely (``top`` is the number of the first visible
+    row) so pending damage stays valid while the grid scrolls.
+    """
+
+    CELL_W = ADVANCE
+    CELL_H = GLYPH_HEIGHT + 2
+
+    def __init__(self, x, y, cols, rows, fg=(200, 200, 200), bg=(0, 0, 0)):
+        self.x = x
+        self.y = y
+        self.cols = cols
+        self.rows = rows
+        self.w = cols * self.CELL_W
+        self.h = rows * self.CELL_H
+        self.fg = fg
+        self.bg = bg
+        self.hover = False
+        self.window = None
+        self.lines = deque(([" "] * cols for _ in range(rows)), maxlen=rows)
+        self.top = 0
+        self.cursor_x = 0
+        self.cursor_y = 0
+        self._damage = {}
+        self._scrolled = 0
+        self._full = True
+
+    def write(self, text):
+        cols = self.cols
+        for n, line in enumerate(text.split("\n")):
+            if n:
+                self._newline()
+            for m, part in enumerate(line.split("\r")):
+                if m:
+                    self.cursor_x = 0
+                while part:
+                    if self.cursor_x >= cols:
+                        self._newline()
+                    room = cols - self.cursor_x
+                    self._put(part[:room])
+                    part = part[room:]
+        if self.window is not None:
+            self.window.redraw_widget(self)
+
+    def clear(self):
+        for line in self.lines:
+            line[:] = [" "] * self.cols
+        self.cursor_x = self.cursor_y = 0
+        self._damage.clear()
+        self._full = True
+        if self.window is not None:
+            self.window.redraw_widget(self)
+
+    def invalidate(self):
+        """Repaint the whole console on the next draw (the window calls this on a full widget redraw)."""
+        self._full = True
+        self._damage.clear()
+
+    def _put(self, chunk):
+        if not chunk:
+            return
+        lo = self.cursor_x
+        hi = lo + len(chunk)
+        self.lines[self.cursor_y][lo:hi] = chunk
+        self.cursor_x = hi
+        if self._full:
+            return
+        key = self.top + self.cursor_y
+        span = self._damage.get(key)
+        self._damage[key] = (min(span[0], lo), max(span[1], hi)) if span else (lo, hi)
+
+    def _newline(self):
+        self.cursor_x = 0
+        if self.cursor_y < self.rows - 1:
+            self.cursor_y += 1
+            return
+        self.lines.append([" "] * self.cols)
+        self.top += 1
+        self._scrolled += 1
+        if self._scrolled >= self.rows:
+            self._full = True
+            self._damage.clear()
+
+    def draw(self, win):
+        self.window = win
+        if self._full:
+            win.fill_rect(self.x, self.y, self.w, self.h, self.bg)
+            for row, line in enumerate(self.lines):
+                self._draw_span(win, row, line, 0, self.cols)
+        else:
+            if self._scrolled:
+                win.scroll(0, -self._scrolled * self.CELL_H, (self.x, self.y, self.w, self.h), self.bg)
+            for key, (lo, hi) in self._damage.items():
+                row = key - self.top
+                if 0 <= row < self.rows:
+                    self._draw_span(win, row, self.lines[row], lo, hi)
+        self._damage.clear()
+        self._scrolled = 0
+        self._full = False
+
+    def _draw_span(self, win, row, line, lo, hi):
+        px = self.x + lo * self.CELL_W
+        py = self.y + row * self.CELL_H
+        win.fill_rect(px, py, (hi - lo) * self.CELL_W, self.CELL_H, self.bg)
+        text = "".join(line[lo:hi]).rstrip()
+        if text:
+            win.draw_text(px, py + 1, text, self.fg)
+
+    def handle_click(self, x, y):
+        # Let clicks fall through so the window still focuses and drags.
+        return False
+
+    def handle_hover(self, x, y):
+        self.hover = self.x <= x < self.x + self.w and self.y <= y < self.y + self.h
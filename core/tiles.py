@@ -0,0 +1,78 @@
+"""Tile diffing and compression shared by the session recorder and display server.
+
+A frame is packed RGB bytes (FrameBuffer.to_bytes()). It is cut into square
+tiles; a tile is the concatenation of its rows. Delta tiles can be stored
+XORed against the previous frame's tile, which turns unchanged pixels into
+zero runs that zlib squeezes to almost nothing.
+"""
+import zlib
+
+TILE = 16
+
+
+def tile_grid(width, height, tile=TILE):
+    """Return the number of tile columns and rows covering a width x height frame."""
+    return (width + tile - 1) // tile, (height + tile - 1) // tile
+
+
+def tile_rect(tx, ty, width, height, tile=TILE):
+    x0, y0 = tx * tile, ty * tile
+    return (x0, y0, min(x0 + tile, width), min(y0 + tile, height))
+
+
+def read_tile(frame, width, rect):
+    x0, y0, x1, y1 = rect
+    stride = width * 3
+    return b"".join(
+        frame[i:i + (x1 - x0) * 3]
+        for i in range(y0 * stride + x0 * 3, y1 * stride, stride)
+    )
+
+
+def write_tile(frame, width, rect, data):
+    x0, y0, x1, y1 = rect
+    stride = width * 3
+    n = (x1 - x0) * 3
+    for k, i in enumerate(range(y0 * stride + x0 * 3, y1 * stride, stride)):
+        frame[i:i + n] = data[k * n:(k + 1) * n]
+
+
+def xor_bytes(a, b):
+    return (int.from_bytes(a, "little") ^ int.from_bytes(b, "little")).to_bytes(len(a), "little")
+
+
+def changed_tiles(prev, cur, width, height, tile=TILE, rects=None):
+    """Yield (tx, ty) for every tile whose pixels differ between two frames.
+
+    Whole bands of tile rows are compared first with one slice comparison,
+    so unchanged parts of the screen cost almost nothing. rects, if given,
+    limits the search to tiles touching those (x0, y0, x1, y1) rectangles.
+    """
+    cols, rows = tile_grid(width, height, tile)
+    stride = width * 3
+    if rects is None:
+        bands = {ty: range(cols) for ty in range(rows)}
+    else:
+        bands = {}
+        for x0, y0, x1, y1 in rects:
+            for ty in range(max(y0, 0) // tile, min((y1 - 1) // tile + 1, rows)):
+                cols_hit = bands.setdefault(ty, set())
+                cols_hit.update(range(max(x0, 0) // tile, min((x1 - 1) // tile + 1, cols)))
+    for ty in sorted(bands):
+        a, b = ty * tile * stride, min((ty + 1) * tile, height) * stride
+        if prev[a:b] == cur[a:b]:
+            continue
+        for tx in sorted(bands[ty]):
+            rect = tile_rect(tx, ty, width, height, tile)
+            if read_tile(prev, width, rect) != read_tile(cur, width, rect):
+                yield tx, ty
+
+
+def encode_tile(data, prev=None, level=1):
+    """Compress a tile, XORed against prev when given."""
+    return zlib.compress(xor_bytes(data, prev) if prev is not None else data, level)
+
+
+def decode_tile(payload, prev=None):
+    data = zlib.decompress(payload)
+    return xor_bytes(data, prev) if prev is not None else data
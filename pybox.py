@@ -8,6 +8,11 @@ import textwrap
 import signal
 import sys
 
+from core.graphics import Display
+from core.shared_fb import ENV_VAR, SharedFrameBuffer
+
+FB_WIDTH, FB_HEIGHT = 320, 240
+
 # === VM METADATA MANAGER ===
 class PyBoxManager:
     def __init__(self, storage_file="vms.json"):
@@ -54,6 +59,8 @@ class VMConsole(tk.Toplevel):
 
         self.proc = proc
         self.thread = thread
+        self.fb = None
+        self.display = None
 
         self.text = scrolledtext.ScrolledText(self, state='disabled', bg='black', fg='white')
         self.text.pack(fill=tk.BOTH, expand=True)
@@ -78,6 +85,30 @@ class VMConsole(tk.Toplevel):
     def set_thread(self, thread):
         self.thread = thread
 
+    def attach_framebuffer(self, fb):
+        # The canvas only appears once the guest publishes its first frame,
+        # so text-only PISOs keep the plain console.
+        self.fb = fb
+        self.after(33, self.poll_framebuffer)
+
+    def poll_framebuffer(self):
+        if self.fb is None:
+            return
+        rect = self.fb.poll()
+        if rect is not None:
+            if self.display is None:
+                canvas = tk.Canvas(self, width=self.fb.width, height=self.fb.height, bg='black')
+                canvas.pack(side=tk.TOP, before=self.text)
+                self.display = Display(canvas, self.fb)
+            self.display.present([rect])
+        self.after(33, self.poll_framebuffer)
+
+    def release_framebuffer(self):
+        if self.fb is not None:
+            fb, self.fb = self.fb, None
+            self.display = None
+            fb.close()
+
     def write(self, data):
         self.text.config(state='normal')
         self.text.insert(tk.END, data)
@@ -115,8 +146,10 @@ class VMConsole(tk.Toplevel):
         if self.proc and self.proc.poll() is None:
             if messagebox.askyesno("Exit", "VM is running. Kill and close?"):
                 self.kill()
+                self.release_framebuffer()
                 self.destroy()
         else:
+            self.release_framebuffer()
             self.destroy()
 
 
@@ -215,13 +248,23 @@ class PyBoxGUI(tk.Tk):
 
         console = VMConsole(self, vm_name)
 
+        # Every VM gets a shared framebuffer; the guest finds it through
+        # PYBOX_FB and can import core from the PyBox directory.
+        fb = SharedFrameBuffer.create(FB_WIDTH, FB_HEIGHT)
+        console.attach_framebuffer(fb)
+        env = dict(os.environ)
+        env[ENV_VAR] = fb.path
+        pybox_dir = os.path.dirname(os.path.abspath(__file__))
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (pybox_dir, env.get("PYTHONPATH")) if p)
+
         def run_vm():
             proc = subprocess.Popen(
                 ["python3", path],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
                 text=True,
-                bufsize=1
+                bufsize=1,
+                env=env
             )
             console.set_proc(proc)
 
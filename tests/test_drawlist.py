@@ -0,0 +1,48 @@
+import random
+
+from core.drawlist import execute, optimize, validate
+from core.graphics import FrameBuffer
+
+W, H = 40, 30
+COLORS = [(255, 0, 0), (0, 255, 0), (1, 2, 3)]
+
+
+def random_op(rng):
+    color = rng.choice(COLORS)
+    pos = lambda: rng.randint(-5, 45)
+    size = lambda: rng.randint(-4, 12)
+    kind = rng.choice(["pixel"] * 5 + ["rect", "hline", "vline", "text", "copy", "scroll", "clear"])
+    if kind == "pixel":
+        return ("pixel", pos(), pos(), color)
+    if kind == "rect":
+        return ("rect", pos(), pos(), size(), size(), color)
+    if kind in ("hline", "vline"):
+        return (kind, pos(), pos(), size(), color)
+    if kind == "text":
+        return ("text", pos(), pos(), rng.choice(["", "ab", "X"]), color)
+    if kind == "copy":
+        return ("copy", pos(), pos(), (pos(), pos(), size(), size()))
+    if kind == "scroll":
+        return ("scroll", rng.randint(-3, 3), rng.randint(-3, 3), None, color)
+    return ("clear", color)
+
+
+def render(ops):
+    fb = FrameBuffer(W, H)
+    execute(fb, ops)
+    return fb.to_bytes()
+
+
+def test_optimize_matches_unoptimized():
+    rng = random.Random(3)
+    for _ in range(2000):
+        ops = [random_op(rng) for _ in range(rng.randint(1, 30))]
+        x, y = rng.randint(-2, 38), rng.randint(0, 29)
+        ops += [("pixel", x + i, y, COLORS[0]) for i in range(rng.randint(0, 6))]
+        ops = validate(ops)
+        assert render(optimize(ops, W, H)) == render(ops), ops
+
+
+def test_pixel_after_empty_hline_is_kept():
+    ops = [("hline", 5, 0, -3, (1, 2, 3)), ("pixel", 2, 0, (1, 2, 3))]
+    assert optimize(ops, W, H) == [("pixel", 2, 0, (1, 2, 3))]
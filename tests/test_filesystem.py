@@ -0,0 +1,96 @@
+import random
+
+from core.filesystem import CHUNK_SIZE, FileSystem
+from core.memory import Memory
+
+
+def contents(fs):
+    """Map every path in fs to its content (None for directories)."""
+    tree = {}
+    for dirpath, dirnames, filenames in fs.walk("/"):
+        base = dirpath.rstrip("/")
+        tree[dirpath] = None
+        for name in filenames:
+            tree[f"{base}/{name}"] = fs.read_file(f"{base}/{name}")
+    return tree
+
+
+def check_du(fs):
+    """Every directory's du() equals the sum of the file sizes below it."""
+    totals = {}
+    for dirpath, dirnames, filenames in reversed(list(fs.walk("/"))):
+        base = dirpath.rstrip("/")
+        total = sum(fs.stat(f"{base}/{name}")["size"] for name in filenames)
+        total += sum(totals[f"{base}/{name}"] for name in dirnames)
+        totals[dirpath] = total
+        assert fs.du(dirpath) == total, dirpath
+    return totals["/"]
+
+
+def random_op(fs, rng):
+    dirs = [d for d, _, _ in fs.walk("/")]
+    files = [p for p, c in contents(fs).items() if c is not None]
+    base = rng.choice(dirs).rstrip("/")
+    choice = rng.randrange(6)
+    if choice == 0:
+        fs.make_dir(f"{base}/d{rng.randrange(4)}")
+    elif choice == 1 or not files:
+        path = f"{base}/f{rng.randrange(6)}"
+        stat = fs.stat_many([path])[0]
+        if stat is None or stat["type"] == "file":
+            fs.write_file(path, rng.choice(["x" * rng.randrange(200), bytes(rng.randrange(300))]))
+    elif choice == 2:
+        with fs.open(rng.choice(files), "ab") as handle:
+            handle.write(b"y" * rng.randrange(CHUNK_SIZE // 4))
+    elif choice == 3:
+        with fs.open(rng.choice(files), "r+b") as handle:
+            handle.seek(rng.randrange(100))
+            handle.write(b"z" * rng.randrange(50))
+    elif choice == 4:
+        with fs.open(rng.choice(files), "r+b") as handle:
+            handle.truncate(rng.randrange(50))
+    elif len(dirs) > 1 or files:
+        fs.delete(rng.choice([d for d in dirs if d != "/"] + files))
+
+
+def test_snapshot_and_clone_isolation():
+    rng = random.Random(1)
+    memory = Memory()
+    base = FileSystem(memory=memory)
+    for _ in range(40):
+        random_op(base, rng)
+    frozen = contents(base)
+    snap = base.snapshot()
+    clones = [base.clone() for _ in range(3)]
+    for fs in [base] + clones:
+        for _ in range(40):
+            random_op(fs, rng)
+        check_du(fs)
+    assert contents(snap) == frozen
+    check_du(snap)
+    assert -(-check_du(base) // 1024) == memory.used_kb()
+
+
+def test_snapshot_is_read_only():
+    fs = FileSystem()
+    fs.write_file("/a", "1")
+    snap = fs.snapshot()
+    try:
+        snap.write_file("/a", "2")
+    except PermissionError:
+        pass
+    else:
+        raise AssertionError("snapshot accepted a write")
+    assert fs.read_file("/a") == "1"
+
+
+def test_writes_to_deleted_file_are_not_charged():
+    memory = Memory()
+    fs = FileSystem(memory=memory)
+    fs.make_dir("/a")
+    handle = fs.open("/a/f", "w")
+    handle.write("x" * 1000)
+    fs.delete("/a/f")
+    handle.write("y" * 5000)
+    assert fs.du("/a") == 0
+    assert memory.used_kb() == 0
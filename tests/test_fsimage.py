@@ -0,0 +1,86 @@
+import os
+import random
+
+from core import fsimage
+from core.blobstore import digest_of
+from core.filesystem import FileSystem
+
+from test_filesystem import check_du, contents, random_op
+
+
+def test_save_load_round_trip(tmp_path):
+    image = str(tmp_path / "fs.img")
+    fs = FileSystem()
+    fs.make_dir("/docs")
+    fs.write_file("/docs/a.txt", "hello " * 50)
+    fs.write_file("/docs/b.bin", bytes(range(256)) * 600)
+    fs.write_file("/docs/copy.bin", bytes(range(256)) * 600)
+    fs.write_file("/empty", "")
+    fsimage.save(fs, image)
+    loaded = fsimage.load(image, journal=False)
+    assert contents(loaded) == contents(fs)
+    check_du(loaded)
+
+
+def test_journal_replay_matches_live_tree(tmp_path):
+    image = str(tmp_path / "fs.img")
+    rng = random.Random(2)
+    fs = FileSystem()
+    for _ in range(30):
+        random_op(fs, rng)
+    fsimage.save(fs, image)
+    live = fsimage.load(image)
+    for _ in range(60):
+        random_op(live, rng)
+    live.journal.close()
+    replayed = fsimage.load(image, journal=False)
+    assert contents(replayed) == contents(live)
+    check_du(replayed)
+
+
+def test_stale_handle_writes_do_not_break_replay(tmp_path):
+    image = str(tmp_path / "fs.img")
+    fsimage.save(FileSystem(), image)
+    fs = fsimage.load(image)
+    handle = fs.open("/log", "w")
+    handle.write("one\n")
+    fs.delete("/log")
+    handle.write("two\n")
+    fs.write_file("/log", "new")
+    handle.write("three\n")
+    fs.journal.close()
+    assert fsimage.load(image, journal=False).read_file("/log") == "new"
+
+
+def test_forged_digest_is_not_shared(tmp_path):
+    image = str(tmp_path / "fs.img")
+    fs = FileSystem()
+    fs.write_file("/b", b"B" * 100)
+    fsimage.save(fs, image)
+    with open(image, "rb") as f:
+        data = f.read()
+    with open(image, "wb") as f:
+        f.write(data.replace(digest_of(b"B" * 100), digest_of(b"A" * 100)))
+    loaded = fsimage.load(image, journal=False)
+    assert loaded.read_file("/b") == b"B" * 100
+    other = FileSystem()
+    other.write_file("/mine", b"A" * 100)
+    assert other.read_file("/mine") == b"A" * 100
+
+
+def test_mounts_are_not_saved_or_journaled(tmp_path):
+    image = str(tmp_path / "fs.img")
+    host = tmp_path / "host"
+    host.mkdir()
+    (host / "big").write_bytes(os.urandom(200 * 1024))
+    fs = FileSystem()
+    fs.write_file("/keep", "kept")
+    fs.mount("/ro", str(host))
+    fsimage.save(fs, image)
+    assert os.path.getsize(image) < 4096
+    live = fsimage.load(image)
+    live.mount("/w", str(host), readonly=False)
+    live.write_file("/w/new", "abc")
+    live.journal.close()
+    reloaded = fsimage.load(image, journal=False)
+    assert contents(reloaded) == {"/": None, "/keep": "kept"}
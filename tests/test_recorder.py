@@ -0,0 +1,72 @@
+import random
+
+from core.graphics import FrameBuffer
+from core.recorder import FOOTER, SessionPlayer, SessionRecorder
+
+
+def record(fb, recorder, count, rng):
+    frames = []
+    for i in range(count):
+        x, y = rng.randrange(fb.width - 4), rng.randrange(fb.height - 4)
+        fb.fill_rect(x, y, 4, 4, (i % 256, 255 - i % 256, 7))
+        frames.append(fb.to_bytes())
+        recorder.capture([(x, y, x + 4, y + 4)] if i % 3 else None)
+    recorder.close()
+    return frames
+
+
+def check_seek(player, frames, rng):
+    assert len(player) == len(frames)
+    order = list(range(len(frames)))
+    rng.shuffle(order)
+    for n in order + sorted(order):
+        assert player.seek(n) == frames[n], n
+
+
+def test_seek_in_memory():
+    rng = random.Random(4)
+    fb = FrameBuffer(64, 48)
+    recorder = SessionRecorder(fb, keyframe_interval=5, max_pending=1000)
+    frames = record(fb, recorder, 40, rng)
+    check_seek(SessionPlayer(recorder), frames, rng)
+
+
+def test_seek_from_file(tmp_path):
+    rng = random.Random(5)
+    path = str(tmp_path / "session.rec")
+    fb = FrameBuffer(64, 48)
+    recorder = SessionRecorder(fb, path, keyframe_interval=5, max_pending=1000)
+    frames = record(fb, recorder, 40, rng)
+    assert recorder.records == []
+    player = SessionPlayer(path)
+    check_seek(player, frames, rng)
+    player.close()
+
+
+def test_unclosed_recording_is_rescanned(tmp_path):
+    rng = random.Random(6)
+    path = str(tmp_path / "session.rec")
+    fb = FrameBuffer(64, 48)
+    frames = record(fb, SessionRecorder(fb, path, keyframe_interval=5, max_pending=1000), 20, rng)
+    with open(path, "rb") as f:
+        data = f.read()
+    index_offset = FOOTER.unpack_from(data, len(data) - FOOTER.size)[0]
+    with open(path, "wb") as f:
+        f.write(data[:index_offset - 3])
+    player = SessionPlayer(path)
+    assert len(player) == 19
+    assert player.seek(18) == frames[18]
+    player.close()
+
+
+def test_slow_encoder_keeps_latest_frame(tmp_path):
+    rng = random.Random(7)
+    fb = FrameBuffer(320, 240)
+    recorder = SessionRecorder(fb, str(tmp_path / "s.rec"), keyframe_interval=10, max_pending=2)
+    frames = record(fb, recorder, 100, rng)
+    player = SessionPlayer(recorder.path)
+    assert player.seek(len(player) - 1) == frames[-1]
+    start = 0
+    for n in range(len(player)):
+        start = frames.index(player.seek(n), start)
+    player.close()